@@ -1,162 +1,404 @@
 
-import json
+from collections import namedtuple
 
 import numpy as np
 
-from stiffness import (
-    rotate_Q, 
-    make_Q
-)
+from materials import Material, as_library
 
 # compute the ABD matrix
 
-class Layer:
-    '''Layer of a laminate'''
-
-    def __init__(self):
-        '''Makes a laminate layer'''
-        self.orientation = None
-        self.thickness = None
-        self.materialname = None
-        self.E1 = None
-        self.E2 = None
-        self.G12 = None
-        self.v12 = None
-        self.z_upper = None
-        self.z_lower = None
-        self.Q_nominal = None
-        self.Q = None
-
-
-def read_file(fp):
-    '''reads the file at `fp`
-    returns a list of the layers'''
-    layers: Layer = []
-
-    with open(fp, 'r') as f:
-
-        # skip first line
-        for _ in range(1):
+def integrate_ABD(Q, z_lower, z_upper, dtype=np.float64):
+    '''Integrates the A, B, D matrices of plies in one contraction
+    `Q` is the (N,3,3) stack of ply Q matrices,
+    `z_lower` and `z_upper` the (N,) ply surface heights
+    `dtype` sets the precision, e.g. np.float32 for large sweeps
+    returns: A, B, D, ABD (the assembled 6x6 matrix)'''
+    Q = np.asarray(Q, dtype=dtype)
+    z_lower = np.asarray(z_lower, dtype=dtype)
+    z_upper = np.asarray(z_upper, dtype=dtype)
+
+    # (z_upper^k - z_lower^k) / k for k = 1, 2, 3 and every ply
+    k = np.arange(1, 4)[:,np.newaxis]
+    dz = (z_upper**k - z_lower**k) / k
+
+    A, B, D = np.einsum('kn,nij->kij', dz, Q)
+    return A, B, D, assemble_ABD(A, B, D)
+
+
+def assemble_ABD(A, B, D):
+    '''Assembles the 6x6 ABD matrix (or (...,6,6) stack) from A, B, D'''
+    return np.block([[A, B], [B, D]])
+
+
+Structure = namedtuple('Structure', 'symmetric, balanced, orthotropic')
+
+
+def laminate_structure(A, B, D, tol=1e-8):
+    '''Detects the structure of A, B, D (or (...,3,3) stacks of them)
+    symmetric:   B = 0, compared to sqrt(max|A| max|D|)
+    balanced:    A16 = A26 = 0, compared to max|A|
+    orthotropic: symmetric, balanced and D16 = D26 = 0, compared to max|D|
+    Terms count as zero when they are within `tol` times the scale;
+    `tol` is raised to the rounding noise of single precision input
+    returns: Structure of bools (or bool arrays)'''
+    dtype = np.result_type(np.asarray(A), np.float32)
+    tol = max(tol, 1000 * np.finfo(dtype).eps)
+    A = np.asarray(A, dtype=float)
+    B = np.asarray(B, dtype=float)
+    D = np.asarray(D, dtype=float)
+    A_max = np.abs(A).max(axis=(-2, -1))
+    D_max = np.abs(D).max(axis=(-2, -1))
+
+    symmetric = np.abs(B).max(axis=(-2, -1)) <= tol * np.sqrt(A_max * D_max)
+    balanced = np.maximum(np.abs(A[...,0,2]), np.abs(A[...,1,2])) <= tol * A_max
+    bending = np.maximum(np.abs(D[...,0,2]), np.abs(D[...,1,2])) <= tol * D_max
+    orthotropic = symmetric & balanced & bending
+    return Structure(symmetric, balanced, orthotropic)
+
+
+def invert_ABD(A, B, D, structure=None, tol=1e-8):
+    '''Compliance (inverse ABD) of A, B, D (or (...,3,3) stacks of them)
+    Uses the laminate structure to avoid the full 6x6 inverse:
+    symmetric laminates invert A and D separately,
+    orthotropic ones use the closed form of each 3x3 block
+    `structure` is detected with `tol` unless given
+    Single precision input gives single precision output
+    returns: (...,6,6) compliance, the Structure that was used'''
+    dtype = np.result_type(np.asarray(A), np.float32)
+    A = np.asarray(A, dtype=dtype)
+    B = np.asarray(B, dtype=dtype)
+    D = np.asarray(D, dtype=dtype)
+    if structure is None:
+        structure = laminate_structure(A, B, D, tol)
+
+    # work on flat stacks
+    shape = A.shape[:-2]
+    A = A.reshape(-1, 3, 3)
+    B = B.reshape(-1, 3, 3)
+    D = D.reshape(-1, 3, 3)
+    symmetric = np.broadcast_to(structure.symmetric, shape).ravel()
+    orthotropic = np.broadcast_to(structure.orthotropic, shape).ravel()
+
+    compliance = np.zeros((len(A), 6, 6), dtype=dtype)
+
+    # coupled laminates need the full inverse
+    coupled = ~symmetric
+    if coupled.any():
+        compliance[coupled] = np.linalg.inv(assemble_ABD(A[coupled], B[coupled], D[coupled]))
+
+    # symmetric laminates: inverse of A and D blocks
+    general = symmetric & ~orthotropic
+    if general.any():
+        compliance[general,:3,:3] = np.linalg.inv(A[general])
+        compliance[general,3:,3:] = np.linalg.inv(D[general])
+
+    # orthotropic laminates: 2x2 block and the shear term
+    if orthotropic.any():
+        compliance[orthotropic,:3,:3] = invert_orthotropic(A[orthotropic])
+        compliance[orthotropic,3:,3:] = invert_orthotropic(D[orthotropic])
+
+    return compliance.reshape(shape + (6, 6)), structure
+
+
+def invert_orthotropic(M):
+    '''Closed form inverse of (N,3,3) matrices with M16 = M26 = 0'''
+    det = M[:,0,0] * M[:,1,1] - M[:,0,1] * M[:,0,1]
+    inv = np.zeros_like(M)
+    inv[:,0,0] = M[:,1,1] / det
+    inv[:,1,1] = M[:,0,0] / det
+    inv[:,0,1] = -M[:,0,1] / det
+    inv[:,1,0] = inv[:,0,1]
+    inv[:,2,2] = 1 / M[:,2,2]
+    return inv
+
+
+class LayerView:
+    '''View of one ply of a `Laminate`, with per-layer attributes
+    (orientation, thickness, z, Q and material properties)
+    Reads through to the laminate's arrays'''
+
+    def __init__(self, laminate, index):
+        self._laminate = laminate
+        self._index = index
+
+    @property
+    def orientation(self):
+        return self._laminate.orientation[self._index]
+
+    @property
+    def thickness(self):
+        return self._laminate.thickness[self._index]
+
+    @property
+    def z_lower(self):
+        return self._laminate.z_lower[self._index]
+
+    @property
+    def z_upper(self):
+        return self._laminate.z_upper[self._index]
+
+    @property
+    def Q(self):
+        return self._laminate.Q[self._index]
+
+    @property
+    def material(self):
+        return self._laminate.materials[self._laminate.material[self._index]]
+
+    @property
+    def materialname(self):
+        return self.material.name
+
+    @property
+    def E1(self):
+        return self.material.E1
+
+    @property
+    def E2(self):
+        return self.material.E2
+
+    @property
+    def G12(self):
+        return self.material.G12
+
+    @property
+    def v12(self):
+        return self.material.v12
+
+    @property
+    def Q_nominal(self):
+        return self.material.Q
+
+    @property
+    def rotation_table(self):
+        return self.material.rotation_table
+
+
+class Laminate:
+    '''Laminate stored as arrays, one entry per ply from the bottom up
+    `material` indexes into the `materials` table shared by all plies'''
+
+    __slots__ = (
+        'orientation',
+        'thickness',
+        'z_lower',
+        'z_upper',
+        'material',
+        'materials',
+        'Q'
+    )
+
+    def __init__(self, orientation, thickness, material, materials):
+        '''Makes a laminate from per-ply arrays
+        `orientation` in degrees, `material` as indices into `materials`'''
+        self.orientation = np.array(orientation, dtype=float)
+        self.thickness = np.array(thickness, dtype=float)
+        self.material = np.array(material, dtype=int)
+        self.materials = list(materials)
+        check_material_index(self.material, self.materials)
+        self.z_lower, self.z_upper = ply_z(self.thickness)
+        self.Q = rotate_plies(self.orientation, self.material, self.materials)
+
+        # laminates are never changed once made, so they can be shared
+        for arr in (self.orientation, self.thickness, self.material,
+                    self.z_lower, self.z_upper, self.Q):
+            arr.setflags(write=False)
+
+
+    @classmethod
+    def from_plies(cls, orientation, thickness, material, library=None):
+        '''Makes a laminate from per-ply sequences, bottom up
+        `thickness` and `material` may also be one value for every ply
+        Materials are Material objects, or names looked up in `library`'''
+        orientation = np.array(orientation, dtype=float).ravel()
+        thickness = np.broadcast_to(
+            np.asarray(thickness, dtype=float), orientation.shape)
+        if isinstance(material, (Material, str)):
+            material = [material] * len(orientation)
+        if len(material) != len(orientation):
+            raise ValueError('need one material per ply')
+
+        # resolve names and give each distinct material one table entry
+        materials = []
+        index = {}
+        material_index = []
+        for mat in material:
+            if isinstance(mat, str):
+                if library is None:
+                    raise ValueError(f'no library to look up material: {mat}')
+                mat = library[mat]
+            if id(mat) not in index:
+                index[id(mat)] = len(materials)
+                materials.append(mat)
+            material_index.append(index[id(mat)])
+
+        return cls(orientation, thickness, material_index, materials)
+
+
+    @classmethod
+    def from_rows(cls, rows, mat_dir=''):
+        '''Makes a laminate from rows of a laminate file, top down
+        Each row is (layer, orientation, thickness, materialname)
+        Materials come from `mat_dir`, a MaterialLibrary or directory'''
+        rows = [[str(v).strip() for v in row] for row in rows]
+
+        # rows go top down, the laminate goes bottom up
+        rows.reverse()
+        return cls.from_plies(
+            [float(row[1]) for row in rows],
+            [float(row[2]) for row in rows],
+            [row[3] for row in rows],
+            as_library(mat_dir)
+        )
+
+
+    @classmethod
+    def from_file(cls, fp, mat_dir=''):
+        '''Reads the laminate file at `fp`
+        Materials come from `mat_dir`, a MaterialLibrary or directory'''
+        with open(fp, 'r') as f:
+
+            # skip first line
             next(f)
 
-        # make layers
-        for row, line in enumerate(f):
-
-            # read line and trim whitespace
-            vals = line.split(',')
-            vals = [v.strip() for v in vals]
-
-            # read in layer value
-            layer = Layer()
-            layer.orientation = float(vals[1])
-            layer.thickness = float(vals[2])
-            layer.materialname = vals[3]
-
-            # add layer to the stack
-            layers.append(layer)
-
-    # reverse layers we read in so that we go bottom up?
-    layers.reverse()
-    return layers
-
-
-def calculate_z(layers):
-    '''Calculates the z distance IN PLACE
-    for each layer in `layers`'''
-
-    # find total height of the laminate
-    height = sum(layer.thickness for layer in layers)
-
-    # assign z for each layer
-    current_height = -1 * (height / 2)
-    for layer in layers:
-        next_height = current_height + layer.thickness
-        layer.z_lower = current_height
-        layer.z_upper = next_height
-        current_height = next_height
-
-
-def retreive_mat_data(layers, pre_fp=''):
-    '''retreive the material data for each layer IN PLACE
-    Gets from a file located in the directory `pre_fp`'''
-    # read in the material values for each layer
-    for layer in layers:
-
-        # read json file
-        with open(pre_fp + layer.materialname + '.json', 'r') as f:
-            mat = json.load(f)
-        
-        # assign properties
-        layer.E1 = float(mat['modulus']['E1'])
-        layer.E2 = float(mat['modulus']['E2'])
-        layer.G12 = float(mat['modulus']['G12'])
-        layer.v12 = float(mat['modulus']['v12'])
-        try:
-            layer.Q_nominal = np.array(mat['modulus']['Q'], dtype=float)
-        except:
-            layer.Q_nominal = make_Q(
-                layer.E1,
-                layer.E2,
-                layer.G12,
-                layer.v12
-            )
-
-
-def rotate_layers(layers):
-    '''rotate each layer by it's orientation
-    sets a new Q matrix for the layer IN PLACE'''
-    # rotate Q matrices of each layer
-    for layer in layers:
-        layer.Q = rotate_Q(
-            layer.Q_nominal, 
-            layer.orientation * np.pi / 180
+            rows = [line.split(',') for line in f]
+        return cls.from_rows(rows, mat_dir)
+
+
+    def __len__(self):
+        return len(self.orientation)
+
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError('layer index out of range')
+        return LayerView(self, index % len(self))
+
+
+    def ABD(self):
+        '''Integrates the laminate
+        returns: A, B, D, ABD'''
+        return integrate_ABD(self.Q, self.z_lower, self.z_upper)
+
+
+    def structure(self, tol=1e-8):
+        '''Symmetric, balanced and orthotropic structure of the laminate'''
+        A, B, D, _ = self.ABD()
+        return laminate_structure(A, B, D, tol)
+
+
+    @property
+    def layers(self):
+        '''Per-layer views, bottom up'''
+        return [LayerView(self, i) for i in range(len(self))]
+
+
+class LaminateBuilder:
+    '''Builds a `Laminate` in memory, ply by ply from the bottom up
+    Methods return the builder so calls can be chained, e.g.
+    LaminateBuilder(0.1, carbon).plies([0, 45, -45, 90]).symmetric().build()'''
+
+    def __init__(self, thickness=None, material=None, library=None):
+        '''Makes an empty builder
+        `thickness` and `material` are the defaults for new plies'''
+        self.thickness = thickness
+        self.material = material
+        self.library = library
+        self._orientation = []
+        self._thickness = []
+        self._material = []
+
+
+    def ply(self, orientation, thickness=None, material=None, count=1):
+        '''Adds `count` plies at `orientation` on top of the stack'''
+        if thickness is None:
+            thickness = self.thickness
+        if material is None:
+            material = self.material
+        if thickness is None or material is None:
+            raise ValueError('ply needs a thickness and a material')
+        for _ in range(count):
+            self._orientation.append(float(orientation))
+            self._thickness.append(float(thickness))
+            self._material.append(material)
+        return self
+
+
+    def plies(self, orientations, thickness=None, material=None):
+        '''Adds one ply for each of `orientations`, bottom up'''
+        for orientation in orientations:
+            self.ply(orientation, thickness, material)
+        return self
+
+
+    def symmetric(self):
+        '''Mirrors the plies so far on top of the stack'''
+        self._orientation += self._orientation[::-1]
+        self._thickness += self._thickness[::-1]
+        self._material += self._material[::-1]
+        return self
+
+
+    def build(self):
+        '''Makes a new laminate from the plies so far'''
+        return Laminate.from_plies(
+            self._orientation,
+            self._thickness,
+            self._material,
+            self.library
         )
 
-        # set values close to zero equal to zero
-        with np.nditer(layer.Q, op_flags=['readwrite']) as it:
-            for x in it:
-                if abs(x) <= 1e-5:
-                    x[...] = 0
-
-
-def calculate_ABD_from_layers(layers):
-    '''Calculates the A, B, D matrices for the layers
-    returns: A, B, D'''
-    # find A, B, D
-    A = np.zeros((3,3))
-    B = np.zeros((3,3))
-    D = np.zeros((3,3))
-    for layer in layers:
-        A = A + layer.Q * (layer.z_upper - layer.z_lower)
-        B = B + (1/2) * layer.Q * (layer.z_upper**2 - layer.z_lower**2)
-        D = D + (1/3) * layer.Q * (layer.z_upper**3 - layer.z_lower**3)
-    return A, B, D
+
+def ply_z(thickness):
+    '''z of the lower and upper surface of each ply
+    for plies of `thickness` stacked bottom up about the mid-plane
+    returns: z_lower, z_upper'''
+    z = np.concatenate(([0], np.cumsum(thickness)))
+    z = z - z[-1] / 2
+    return z[:-1], z[1:]
+
+
+def check_material_index(material, materials):
+    '''Raises ValueError unless every index of `material` is in `materials`'''
+    bad = (material < 0) | (material >= len(materials))
+    if bad.any():
+        i = np.flatnonzero(bad)[0]
+        raise ValueError(
+            f'ply {i} has material index {material[i]}, '
+            f'but there are {len(materials)} materials')
+
+
+def rotate_plies(orientation, material, materials):
+    '''Rotated Q matrix of each ply, looked up in its material's table
+    returns: (N,3,3) array'''
+    Q = np.empty((len(orientation), 3, 3))
+    for i, mat in enumerate(materials):
+        plies = material == i
+        Q[plies] = mat.rotate(orientation[plies])
+    return Q
+
 
 def get_layers(lam_file, lam_dir='', mat_dir=''):
-    lam_fp = lam_dir + lam_file
-    layers = read_file(lam_fp)
-    calculate_z(layers)
-    retreive_mat_data(layers, mat_dir)
-    rotate_layers(layers)
-    return layers
+    '''Reads the layers of a `laminate file`
+    `mat_dir` is a MaterialLibrary or the material directory
+    returns: per-layer views of the laminate, bottom up'''
+    laminate = Laminate.from_file(lam_dir + lam_file, mat_dir)
+    return laminate.layers
 
 
 def calculate_ABD(lam_file, lam_dir='', mat_dir=''):
     '''Calculates the ABD matrix from a `laminate file`
     The laminate file is located in directory `lam_dir`
-    The material file is located in directory `mat_dir`'''
-    lam_fp = lam_dir + lam_file
-    layers = read_file(lam_fp)
-    calculate_z(layers)
-    retreive_mat_data(layers, mat_dir)
-    rotate_layers(layers)
-    A, B, D = calculate_ABD_from_layers(layers)
-    return A, B, D, layers
-
+    The material file is located in directory `mat_dir`,
+    or `mat_dir` is a MaterialLibrary'''
+    laminate = Laminate.from_file(lam_dir + lam_file, mat_dir)
+    A, B, D, _ = laminate.ABD()
+    # layer views are only returned for scripts that use them
+    return A, B, D, laminate.layers
 
 
 if __name__ == '__main__':
-    A,B,D = calculate_ABD(
+    A,B,D, layers = calculate_ABD(
         lam_file='problem1.csv', 
         lam_dir='designlib/', 
         mat_dir='designlib/')
@@ -0,0 +1,176 @@
+import json
+
+import numpy as np
+
+from abd import integrate_ABD
+from lamparams import (
+    stiffness_basis,
+    lamination_parameters
+)
+
+# precomputed property atlas over the lamination parameter plane
+#
+# For balanced, symmetric laminates of one material the in-plane stiffness
+# depends only on (xi1, xi3) and, ignoring D16/D26, the bending stiffness
+# only on (xi9, xi11), through the same matrix
+#     S(p, q) = G0 + p G1 + q G3,    A = h S(xi1, xi3),    D = h^3/12 S(xi9, xi11)
+# so one grid over (p, q) in [-1, 1]^2 serves both. Feasible laminates
+# satisfy q >= 2 p^2 - 1.
+
+FIELDS = (
+    'Ex',           # in-plane engineering constants, from A / h at (xi1, xi3)
+    'Ey',
+    'Gxy',
+    'vxy',
+    'D11',          # bending stiffness / h^3, at (xi9, xi11)
+    'D22',
+    'D12',
+    'D66',
+    'k_buckling'    # N_cr b^2 / (pi^2 h^3), uniaxial compression, simply supported
+)
+
+
+def atlas_values(U, p, q, aspect_ratio=1.0, max_half_waves=10):
+    '''Atlas fields at lamination parameters (`p`, `q`) for invariants `U`
+    returns: array of shape p.shape + (len(FIELDS),)'''
+    p, q = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(q, dtype=float))
+    G = stiffness_basis(U)
+    S = G[0] + p[...,np.newaxis,np.newaxis] * G[1] + q[...,np.newaxis,np.newaxis] * G[3]
+    return properties_from_stiffness(S, S / 12, aspect_ratio, max_half_waves)
+
+
+def properties_from_stiffness(A_star, D_star, aspect_ratio=1.0, max_half_waves=10):
+    '''Atlas fields from normalized stiffness A / h and D / h^3
+    returns: array of shape A_star.shape[:-2] + (len(FIELDS),)'''
+    S11 = A_star[...,0,0]
+    S22 = A_star[...,1,1]
+    S12 = A_star[...,0,1]
+
+    values = np.empty(A_star.shape[:-2] + (len(FIELDS),))
+    det = S11 * S22 - S12 * S12
+    values[...,0] = det / S22
+    values[...,1] = det / S11
+    values[...,2] = A_star[...,2,2]
+    values[...,3] = S12 / S22
+
+    D11 = D_star[...,0,0]
+    D22 = D_star[...,1,1]
+    D12 = D_star[...,0,1]
+    D66 = D_star[...,2,2]
+    values[...,4] = D11
+    values[...,5] = D22
+    values[...,6] = D12
+    values[...,7] = D66
+
+    # lowest buckling load over the number of half waves along the length
+    k = np.inf
+    for m in range(1, max_half_waves + 1):
+        r = m / aspect_ratio
+        k = np.minimum(k, D11 * r**2 + 2 * (D12 + 2 * D66) + D22 / r**2)
+    values[...,8] = k
+    return values
+
+
+def build_atlas(fp, material, resolution=201, aspect_ratio=1.0, max_half_waves=10):
+    '''Computes the atlas of `material` and stores it at `fp` (.npy)
+    The grid is `resolution` x `resolution` over (p, q) in [-1, 1]^2,
+    written through a memory map with its settings in `fp` + '.json'.
+    returns: the Atlas, opened read only'''
+    grid = np.linspace(-1, 1, resolution)
+    values = np.lib.format.open_memmap(
+        fp, mode='w+', dtype=np.float64, shape=(resolution, resolution, len(FIELDS)))
+
+    # one row of p at a time keeps memory bounded for fine grids
+    for i, p in enumerate(grid):
+        values[i] = atlas_values(material.U, p, grid, aspect_ratio, max_half_waves)
+    values.flush()
+    del values
+
+    meta = {
+        'material': material.name,
+        'invariants': np.asarray(material.U).tolist(),
+        'fields': list(FIELDS),
+        'resolution': resolution,
+        'aspect_ratio': aspect_ratio,
+        'max_half_waves': max_half_waves
+    }
+    with open(fp + '.json', 'w') as f:
+        json.dump(meta, f, indent=4)
+    return Atlas(fp)
+
+
+class Atlas:
+    '''Memory-mapped property atlas made by `build_atlas`
+    Queries interpolate the grid bilinearly'''
+
+    def __init__(self, fp):
+        '''Opens the atlas stored at `fp`, read only'''
+        with open(fp + '.json', 'r') as f:
+            self.meta = json.load(f)
+        self.fields = tuple(self.meta['fields'])
+        # a plain array view of the map avoids memmap overhead on indexing
+        self.values = np.asarray(np.load(fp, mmap_mode='r'))
+        self.resolution = self.values.shape[0]
+
+
+    def query(self, p, q, fields=None):
+        '''Interpolated fields at lamination parameters (`p`, `q`)
+        Use (xi1, xi3) for Ex-vxy and (xi9, xi11) for the D terms and
+        buckling. Infeasible points (q < 2 p^2 - 1) give NaN.
+        returns: dict of arrays keyed by field name'''
+        p, q = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(q, dtype=float))
+        if fields is None:
+            fields = self.fields
+        columns = [self.fields.index(name) for name in fields]
+
+        # grid cell and position within it
+        n = self.resolution - 1
+        x = np.clip((p + 1) / 2 * n, 0, n)
+        y = np.clip((q + 1) / 2 * n, 0, n)
+        i = np.minimum(x.astype(int), n - 1)
+        j = np.minimum(y.astype(int), n - 1)
+        fx = (x - i)[...,np.newaxis]
+        fy = (y - j)[...,np.newaxis]
+
+        v = self.values
+        values = (
+            v[i, j][...,columns] * (1 - fx) * (1 - fy)
+            + v[i + 1, j][...,columns] * fx * (1 - fy)
+            + v[i, j + 1][...,columns] * (1 - fx) * fy
+            + v[i + 1, j + 1][...,columns] * fx * fy
+        )
+
+        infeasible = (q < 2 * p * p - 1 - 1e-12) | (np.abs(p) > 1) | (np.abs(q) > 1)
+        values[infeasible] = np.nan
+        return {name: values[...,c] for c, name in enumerate(fields)}
+
+
+    def laminate_query(self, laminate, fields=None):
+        '''Interpolated fields of `laminate` (an `abd.Laminate`)
+        In-plane fields come from its (xi1, xi3), bending ones from (xi9, xi11)'''
+        xi, _ = lamination_parameters(laminate)
+        membrane = self.query(xi[0], xi[2], fields)
+        bending = self.query(xi[8], xi[10], fields)
+        return {
+            name: membrane[name] if name in FIELDS[:4] else bending[name]
+            for name in membrane
+        }
+
+
+def validate_atlas(atlas, laminates):
+    '''Compares the atlas with direct integration of `laminates`
+    Laminates should be balanced and symmetric, of the atlas material.
+    The reference engine is `abd.integrate_ABD` on each laminate.
+    returns: dict of the largest relative error of each field'''
+    meta = atlas.meta
+    errors = {name: 0.0 for name in atlas.fields}
+    for laminate in laminates:
+        A, B, D, _ = integrate_ABD(laminate.Q, laminate.z_lower, laminate.z_upper)
+        h = laminate.z_upper[-1] - laminate.z_lower[0]
+        exact = properties_from_stiffness(
+            A / h, D / h**3, meta['aspect_ratio'], meta['max_half_waves'])
+        approx = atlas.laminate_query(laminate)
+        for c, name in enumerate(atlas.fields):
+            error = abs(approx[name] - exact[c]) / abs(exact[c])
+            errors[name] = max(errors[name], float(error))
+    return errors
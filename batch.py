@@ -0,0 +1,218 @@
+import numpy as np
+
+from abd import (
+    assemble_ABD,
+    invert_ABD,
+    check_material_index,
+    rotate_plies
+)
+
+# ABD of many laminates at once
+
+
+class LaminateBatch:
+    '''Many laminates of different ply counts packed into flat ply arrays
+    Plies of laminate k are rows offsets[k]:offsets[k+1], bottom up
+
+    Q and z are stored in `dtype`. np.float32 halves memory and bandwidth
+    for screening sweeps; the ply definitions are kept so any laminates
+    can be re-evaluated in double precision with `subset`.'''
+
+    __slots__ = (
+        'orientation',
+        'thickness',
+        'material',
+        'materials',
+        'offsets',
+        'dtype',
+        'Q',
+        'z_lower',
+        'z_upper'
+    )
+
+    def __init__(self, orientation, thickness, counts, material, materials, dtype=np.float64):
+        '''Packs flat ply arrays, each laminate bottom up
+        `orientation` in degrees, `material` as indices into `materials`
+        `thickness` and `material` may be one value for every ply
+        `counts` is the number of plies in each laminate'''
+        counts = np.asarray(counts, dtype=int)
+        if np.any(counts < 1):
+            raise ValueError('every laminate needs at least one ply')
+        orientation = np.asarray(orientation, dtype=float)
+        if counts.sum() != len(orientation):
+            raise ValueError('ply counts do not match the number of plies')
+
+        self.orientation = orientation
+        self.thickness = np.broadcast_to(np.asarray(thickness, dtype=float), orientation.shape)
+        self.material = np.broadcast_to(np.asarray(material, dtype=int), orientation.shape)
+        self.materials = list(materials)
+        check_material_index(self.material, self.materials)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+        self.dtype = np.dtype(dtype)
+
+        Q = rotate_plies(self.orientation, self.material, self.materials)
+        z_lower, z_upper = batch_ply_z(self.thickness, self.offsets)
+        self.Q = Q.astype(self.dtype, copy=False)
+        self.z_lower = z_lower.astype(self.dtype, copy=False)
+        self.z_upper = z_upper.astype(self.dtype, copy=False)
+
+
+    @classmethod
+    def from_laminates(cls, laminates, dtype=np.float64):
+        '''Packs a sequence of `abd.Laminate` objects'''
+        materials = []
+        index = {}
+        material = []
+        for lam in laminates:
+            for mat in lam.materials:
+                if id(mat) not in index:
+                    index[id(mat)] = len(materials)
+                    materials.append(mat)
+            remap = np.array([index[id(mat)] for mat in lam.materials], dtype=int)
+            material.append(remap[lam.material])
+
+        return cls(
+            np.concatenate([lam.orientation for lam in laminates]),
+            np.concatenate([lam.thickness for lam in laminates]),
+            [len(lam) for lam in laminates],
+            np.concatenate(material),
+            materials,
+            dtype
+        )
+
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+    @property
+    def counts(self):
+        '''Number of plies in each laminate'''
+        return np.diff(self.offsets)
+
+
+    def subset(self, indices, dtype=np.float64):
+        '''New batch of the laminates at `indices`, stored in `dtype`'''
+        indices = np.asarray(indices, dtype=int)
+        counts = self.counts[indices]
+
+        # ply rows of each chosen laminate
+        starts = np.repeat(self.offsets[indices], counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        plies = starts + within
+
+        return LaminateBatch(
+            self.orientation[plies],
+            self.thickness[plies],
+            counts,
+            self.material[plies],
+            self.materials,
+            dtype
+        )
+
+
+    def ABD(self, chunk=1024):
+        '''A, B, D of every laminate, `chunk` laminates at a time
+        Computed in the batch's dtype
+        returns: A, B, D as (K,3,3) arrays and the (K,6,6) ABD'''
+        K = len(self)
+        A = np.empty((K, 3, 3), dtype=self.dtype)
+        B = np.empty((K, 3, 3), dtype=self.dtype)
+        D = np.empty((K, 3, 3), dtype=self.dtype)
+
+        for start in range(0, K, chunk):
+            stop = min(start + chunk, K)
+            lo = self.offsets[start]
+            hi = self.offsets[stop]
+            z_lower = self.z_lower[lo:hi]
+            z_upper = self.z_upper[lo:hi]
+
+            # each ply's (z_upper^k - z_lower^k) / k for k = 1, 2, 3,
+            # laid out ply-last so the sums run over contiguous memory
+            dz = np.empty((3, 1, hi - lo), dtype=self.dtype)
+            dz[0,0] = z_upper - z_lower
+            dz[1,0] = (z_upper*z_upper - z_lower*z_lower) / 2
+            dz[2,0] = (z_upper*z_upper*z_upper - z_lower*z_lower*z_lower) / 3
+            Q = self.Q[lo:hi].reshape(-1, 9).T
+            weighted = np.empty((3, 9, hi - lo), dtype=self.dtype)
+            np.multiply(dz, Q, out=weighted)
+
+            # sum the moments of Q over the plies of each laminate
+            starts = self.offsets[start:stop] - lo
+            moments = np.add.reduceat(weighted.reshape(27, -1), starts, axis=1)
+            moments = moments.T.reshape(-1, 3, 3, 3)
+            A[start:stop] = moments[:,0]
+            B[start:stop] = moments[:,1]
+            D[start:stop] = moments[:,2]
+
+        return A, B, D, assemble_ABD(A, B, D)
+
+
+def batch_ply_z(thickness, offsets):
+    '''z of the lower and upper surface of each ply of packed laminates
+    Each laminate is stacked bottom up about its own mid-plane
+    returns: z_lower, z_upper'''
+    counts = np.diff(offsets)
+    laminate = np.repeat(np.arange(len(counts)), counts)
+    within = np.arange(offsets[-1]) - offsets[:-1][laminate]
+
+    # running height within each laminate, one ply position at a time,
+    # so rounding does not grow with the laminates before it in the batch
+    top = np.empty(len(thickness))
+    bottom = np.zeros(len(thickness))
+    rows = np.argsort(within, kind='stable')
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(within))))
+    for j in range(len(bounds) - 1):
+        plies = rows[bounds[j]:bounds[j+1]]
+        if j > 0:
+            bottom[plies] = top[plies - 1]
+        top[plies] = bottom[plies] + thickness[plies]
+
+    # shift each laminate to its mid-plane
+    half = top[offsets[1:] - 1][laminate] / 2
+    return bottom - half, top - half
+
+
+def batch_ABD(batch, chunk=1024, tol=1e-8):
+    '''ABD and compliance matrices of every laminate in `batch`
+    Compliance uses each laminate's structure, detected with `tol`
+    returns: (K,6,6) ABD, (K,6,6) compliance, abd.Structure of (K,) bools'''
+    A, B, D, ABD = batch.ABD(chunk)
+    compliance, structure = invert_ABD(A, B, D, tol=tol)
+    return ABD, compliance, structure
+
+
+def precision_error(batch, ABD, compliance):
+    '''Estimated relative error of single precision results
+    ABD terms are sums over the plies, so their rounding grows with the
+    ply count; the compliance adds the condition number of ABD
+    (estimated from the 1-norms of ABD and its inverse).
+    returns: (K,) estimated relative error of ABD, and of compliance'''
+    eps = np.finfo(batch.dtype).eps
+    ABD_error = eps * (batch.counts + 2)
+    norm = np.abs(ABD).sum(axis=-2).max(axis=-1)
+    inv_norm = np.abs(compliance).sum(axis=-2).max(axis=-1)
+    compliance_error = ABD_error + eps * norm * inv_norm
+    return ABD_error, compliance_error.astype(np.float64)
+
+
+def screen(batch, objective, k, candidates=None, chunk=1024, tol=1e-8):
+    '''Best `k` laminates of `batch` by `objective`, with exact final scores
+    `objective(ABD, compliance)` returns a (K,) score, lower is better.
+    All laminates are scored in the batch's dtype; the best `candidates`
+    (default 4*k) are then re-scored in double precision and re-ranked.
+    returns: (k,) laminate indices, (k,) float64 scores'''
+    if candidates is None:
+        candidates = 4 * k
+    candidates = min(max(candidates, k), len(batch))
+
+    ABD, compliance, _ = batch_ABD(batch, chunk, tol)
+    score = objective(ABD, compliance)
+    top = np.argpartition(score, candidates - 1)[:candidates]
+
+    # re-check the shortlist in double precision
+    exact = batch.subset(top, np.float64)
+    ABD, compliance, _ = batch_ABD(exact, chunk, tol)
+    score = np.asarray(objective(ABD, compliance), dtype=np.float64)
+    best = np.argsort(score)[:k]
+    return top[best], score[best]
@@ -0,0 +1,108 @@
+# Benchmarks of the batched stiffness paths against the scalar ones
+
+import time
+
+import numpy as np
+
+from stiffness import (
+    make_Q,
+    rotate_Q_batch,
+    Q2props,
+    Q2props_batch
+)
+from materials import Material, Strength
+from abd import Laminate
+from batch import LaminateBatch, batch_ABD
+from sweep import sweep
+from failure import failure_analysis, CRITERIA
+
+
+def timed(f, *args, repeat=3):
+    '''Best wall time of `repeat` calls of f(*args), in seconds'''
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(name, n, t_scalar, t_batch):
+    '''Prints one benchmark result'''
+    print('{:20} n = {:>9,}   scalar {:9.4f} s   batch {:9.4f} s   speedup {:7.1f}x'.format(
+        name, n, t_scalar, t_batch, t_scalar / t_batch))
+
+
+def bench_Q2props(n=100000):
+    '''Q2props over `n` rotated Q matrices, one at a time vs batched
+    The batch takes properties from the compliance and `Q2props` does not,
+    so the results intentionally differ and only the speed is compared'''
+    Q = rotate_Q_batch(make_Q(150, 10, 5, 0.3), np.linspace(0, np.pi, n))[0]
+    t_scalar = timed(lambda: [Q2props(q) for q in Q], repeat=1)
+    t_batch = timed(Q2props_batch, Q)
+    report('Q2props', n, t_scalar, t_batch)
+
+
+def random_laminates(K, min_plies=4, max_plies=16, seed=0):
+    '''`K` random laminates of 0/45/-45/90 plies, as flat arrays
+    returns: orientation, counts'''
+    rng = np.random.RandomState(seed)
+    counts = rng.randint(min_plies, max_plies + 1, K)
+    orientation = rng.choice([0., 45., -45., 90.], counts.sum())
+    return orientation, counts
+
+
+def bench_batch_ABD(K=1000, loop_limit=1000):
+    '''ABD and compliance of `K` laminates, looped vs packed in one batch
+    The loop is timed on at most `loop_limit` laminates and scaled up'''
+    mat = Material('carbon', 150, 10, 5, 0.3)
+    orientation, counts = random_laminates(K)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def loop(n):
+        for k in range(n):
+            lam = Laminate.from_plies(orientation[offsets[k]:offsets[k+1]], 0.1, mat)
+            np.linalg.inv(lam.ABD()[3])
+
+    def batched():
+        batch = LaminateBatch(orientation, 0.1, counts, 0, [mat])
+        batch_ABD(batch)
+
+    n = min(K, loop_limit)
+    t_scalar = timed(loop, n, repeat=1) * K / n
+    t_batch = timed(batched, repeat=1)
+    report('batch_ABD', K, t_scalar, t_batch)
+    print('{:20} {:,.0f} laminates/s'.format('', K / t_batch))
+
+
+def stiffest(candidates):
+    '''Sweep objective: highest Ex'''
+    return -candidates.Ex
+
+
+def bench_sweep(plies=16, angles=(0, 45, -45, 90, 30, -30, 60, -60)):
+    '''Exhaustive sweep of symmetric `plies`-ply laminates'''
+    mat = Material('carbon', 150, 10, 5, 0.3)
+    n = len(angles) ** ((plies + 1) // 2)
+    t = timed(sweep, angles, [plies], stiffest, mat, 0.1, True, repeat=1)
+    print('{:20} n = {:>9,}   {:9.4f} s   {:,.0f} candidates/s'.format('sweep', n, t, n / t))
+
+
+def bench_failure(L=4000, criteria=CRITERIA):
+    '''Failure analysis of a 40-ply laminate under `L` load cases'''
+    strength = Strength(1500, 1200, 50, 250, 70, 0.01, 0.008, 0.005, 0.025, 0.014)
+    mat = Material('carbon', 150e3, 10e3, 5e3, 0.3, strength=strength)
+    lam = Laminate.from_plies([0, 45, -45, 90] * 5 + [90, -45, 45, 0] * 5, 0.125, mat)
+    loads = np.random.RandomState(0).normal(size=(L, 6)) * [500, 200, 100, 50, 50, 20]
+    n = L * len(lam) * 3
+    for criterion in criteria:
+        t = timed(failure_analysis, lam, loads, criterion)
+        print('{:20} n = {:>9,}   {:9.4f} s   {:,.0f} ply points/s'.format(criterion, n, t, n / t))
+
+
+if __name__ == '__main__':
+    bench_Q2props()
+    for K in (1000, 100000, 1000000):
+        bench_batch_ABD(K)
+    bench_sweep()
+    bench_failure()
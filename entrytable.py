@@ -119,6 +119,12 @@ class EntryTable(tk.Frame):
                 yield cell
 
 
+    def data_rows(self):
+        '''Generator for the text of each row in the data table'''
+        for row in self._table_data:
+            yield [cell.text.get() for cell in row]
+
+
     def selected_rows(self):
         '''Generator for the selected rows'''
         for row, widget in enumerate(self._table_body):
@@ -0,0 +1,105 @@
+import csv
+from collections import namedtuple
+
+import numpy as np
+
+from solver import LaminateSolver
+from failure import failure_analysis, MODES
+
+# failure envelopes in a plane of load space
+#
+# Loads are applied along unit directions in the plane of two load
+# components, e.g. Nx-Ny. The load at failure along each direction is the
+# strength ratio of the most critical ply (closed form for every
+# criterion in `failure`), so the envelope is one vectorized failure
+# analysis over all directions.
+#
+# The 'strain_allowable' criterion checks midplane strains and curvatures
+# against laminate allowables, as projectscript.py does with ABD @ allowable.
+
+
+LOADS = ('Nx', 'Ny', 'Nxy', 'Mx', 'My', 'Mxy')
+
+Envelope = namedtuple('Envelope', 'components, angle, factor, points, ply, mode')
+
+
+def failure_envelope(laminate, components=('Nx', 'Ny'), directions=3600,
+                     criterion='tsai_wu', allowable=None, points=3, solver=None):
+    '''Failure envelope of `laminate` (an `abd.Laminate`) in a load plane
+    `components` names two of LOADS, `directions` evenly spaced load
+    directions go around the plane. `criterion` is one of
+    `failure.CRITERIA`, or 'strain_allowable' with `allowable` the (6,)
+    midplane strain and curvature allowables (0 where unchecked).
+    Directions that never fail have an infinite factor, and their points
+    are kept as inf along the direction's nonzero components (0 elsewhere)
+    returns: Envelope of the plane's components, direction angles
+    (radians), load factor to failure along each unit direction, polygon
+    points (D,2), and the critical ply and mode (-1 for strain_allowable)'''
+    try:
+        axes = [LOADS.index(name) for name in components]
+    except ValueError:
+        raise ValueError(f'load components must be two of {LOADS}') from None
+    if len(axes) != 2 or axes[0] == axes[1]:
+        raise ValueError('need two different load components')
+    if solver is None:
+        solver = LaminateSolver.from_laminate(laminate)
+
+    angle = np.linspace(0, 2 * np.pi, directions, endpoint=False)
+    loads = np.zeros((directions, 6))
+    loads[:,axes[0]] = np.cos(angle)
+    loads[:,axes[1]] = np.sin(angle)
+
+    if criterion == 'strain_allowable':
+        if allowable is None:
+            raise ValueError('strain_allowable needs the allowable strains')
+        factor = strain_allowable_factor(solver.strains(loads), allowable)
+        ply = np.full(directions, -1)
+        mode = np.full(directions, -1)
+    else:
+        result = failure_analysis(laminate, loads, criterion, points, solver)
+        factor = result.min_ratio
+        ply = result.critical_ply
+        mode = result.critical_mode
+
+    # inf * 0 would give nan, so unbounded points are set separately
+    direction = loads[:,axes]
+    finite = np.isfinite(factor)
+    points = np.where(direction == 0, 0, np.copysign(np.inf, direction))
+    points[finite] = factor[finite,np.newaxis] * direction[finite]
+    return Envelope(tuple(components), angle, factor, points, ply, mode)
+
+
+def strain_allowable_factor(strains, allowable):
+    '''Load factor at which `strains` ((...,6) per unit load) first reach
+    `allowable` in magnitude; components with a zero allowable are skipped
+    returns: array of shape strains.shape[:-1]'''
+    allowable = np.abs(np.asarray(allowable, dtype=float))
+    checked = allowable > 0
+    with np.errstate(divide='ignore'):
+        ratio = allowable[checked] / np.abs(strains[...,checked])
+    return ratio.min(axis=-1)
+
+
+def save_envelope(envelope, fp):
+    '''Writes `envelope` to `fp`, as .npy (array of angle, the two load
+    components, factor, ply, mode columns) or else as .csv with a header'''
+    table = np.column_stack((
+        envelope.angle,
+        envelope.points,
+        envelope.factor,
+        envelope.ply,
+        envelope.mode
+    ))
+    if fp.endswith('.npy'):
+        np.save(fp, table)
+        return
+
+    with open(fp, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['angle', *envelope.components, 'factor', 'ply', 'mode'])
+        for row, mode in zip(table, envelope.mode):
+            writer.writerow([
+                *(f'{value:.10g}' for value in row[:4]),
+                int(row[4]),
+                MODES[mode] if mode >= 0 else ''
+            ])
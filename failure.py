@@ -0,0 +1,198 @@
+from collections import namedtuple
+
+import numpy as np
+
+from recovery import recover
+from solver import LaminateSolver
+
+# ply failure criteria over load cases, plies and z points
+#
+# Each criterion gives the strength ratio R: the factor on the load at
+# which the ply fails, so R < 1 has failed and the margin of safety is
+# R - 1. Stresses and strains are in material axes, allowables positive.
+#
+# max_stress, max_strain  each component against its allowable
+# tsai_hill, tsai_wu      quadratic interaction, F12* = -1/2 for Tsai-Wu
+# hashin                  plane stress fiber and matrix modes, with the
+#                         transverse shear strength taken equal to S
+
+
+CRITERIA = ('max_stress', 'max_strain', 'tsai_hill', 'tsai_wu', 'hashin')
+
+MODES = ('fiber tension', 'fiber compression', 'matrix tension', 'matrix compression', 'shear')
+
+FIBER_TENSION, FIBER_COMPRESSION, MATRIX_TENSION, MATRIX_COMPRESSION, SHEAR = range(5)
+
+FailureResult = namedtuple(
+    'FailureResult', 'ratio, margin, mode, critical_ply, critical_point, critical_mode, min_ratio')
+
+
+def ply_allowables(laminate):
+    '''Strength of each ply's material, as fields of `materials.Strength`
+    returns: (N,10) array'''
+    table = []
+    for mat in laminate.materials:
+        if mat.strength is None:
+            raise ValueError(f'material has no strength allowables: {mat.name}')
+        table.append(mat.strength)
+    return np.array(table, dtype=float)[laminate.material]
+
+
+def strength_ratio(stress, strain, allowables, criterion='tsai_wu'):
+    '''Strength ratio and failure mode of each ply point
+    `stress` and `strain` are (...,3) in material axes (`strain` is
+    only used by max_strain), `allowables` broadcasts against
+    (...,10) in the field order of `materials.Strength`
+    returns: ratio, mode index into MODES, both of shape stress.shape[:-1]'''
+    try:
+        ratio = _CRITERIA[criterion]
+    except KeyError:
+        raise ValueError(f'unknown failure criterion: {criterion}') from None
+    allowables = np.asarray(allowables, dtype=float)
+    values = strain if criterion == 'max_strain' else stress
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return ratio(np.asarray(values, dtype=float), allowables)
+
+
+def failure_analysis(laminate, loads, criterion='tsai_wu', points=3, solver=None):
+    '''Strength ratios of every ply of `laminate` under `loads`, (6,) or (L,6)
+    `points` z points are checked through each ply, see `recovery.recover`
+    returns: FailureResult of ratio, margin and mode (L,N,P), and for each
+    load case the critical ply, z point, mode and its ratio (L,)'''
+    if solver is None:
+        solver = LaminateSolver.from_laminate(laminate)
+    strains = np.atleast_2d(solver.strains(loads))
+    recovered = recover(laminate, strains, points, axes='material')
+    allowables = ply_allowables(laminate)[:,np.newaxis]
+
+    ratio, mode = strength_ratio(recovered.stress, recovered.strain, allowables, criterion)
+
+    # weakest point of each load case
+    L = len(ratio)
+    flat = ratio.reshape(L, -1).argmin(axis=1)
+    ply, point = np.unravel_index(flat, ratio.shape[1:])
+    cases = np.arange(L)
+    return FailureResult(
+        ratio,
+        ratio - 1,
+        mode,
+        ply,
+        point,
+        mode[cases, ply, point],
+        ratio[cases, ply, point]
+    )
+
+
+def _sign_ratio(value, tension, compression):
+    '''Allowable over |value|, using the allowable of its sign'''
+    return np.where(value >= 0, tension, compression) / np.abs(value)
+
+
+def _component_ratio(values, allowables, offset):
+    '''Smallest of the three component ratios and its mode'''
+    a = allowables
+    r1 = _sign_ratio(values[...,0], a[...,offset], a[...,offset+1])
+    r2 = _sign_ratio(values[...,1], a[...,offset+2], a[...,offset+3])
+    r6 = a[...,offset+4] / np.abs(values[...,2])
+
+    fiber = np.where(values[...,0] >= 0, FIBER_TENSION, FIBER_COMPRESSION)
+    matrix = np.where(values[...,1] >= 0, MATRIX_TENSION, MATRIX_COMPRESSION)
+    ratio = np.minimum(np.minimum(r1, r2), r6)
+    mode = np.where(r1 == ratio, fiber, np.where(r2 == ratio, matrix, SHEAR))
+    return ratio, mode
+
+
+def _max_stress(stress, allowables):
+    return _component_ratio(stress, allowables, 0)
+
+
+def _max_strain(strain, allowables):
+    return _component_ratio(strain, allowables, 5)
+
+
+def _quadratic_mode(s1, s2, s6, X, Y, S):
+    '''Mode of the largest of the squared component terms'''
+    f1 = (s1 / X)**2
+    f2 = (s2 / Y)**2
+    f6 = (s6 / S)**2
+    fiber = np.where(s1 >= 0, FIBER_TENSION, FIBER_COMPRESSION)
+    matrix = np.where(s2 >= 0, MATRIX_TENSION, MATRIX_COMPRESSION)
+    return np.where((f1 >= f2) & (f1 >= f6), fiber, np.where(f2 >= f6, matrix, SHEAR))
+
+
+def _root(a, b):
+    '''Positive root R of a R^2 + b R = 1, inf if there is none'''
+    disc = np.sqrt(b * b + 4 * a)
+    # the stable form of (-b + disc) / 2a, which also covers a = 0
+    R = 2 / (b + disc)
+    return np.where(b + disc > 0, R, np.inf)
+
+
+def _tsai_hill(stress, allowables):
+    s1 = stress[...,0]
+    s2 = stress[...,1]
+    s6 = stress[...,2]
+    X = np.where(s1 >= 0, allowables[...,0], allowables[...,1])
+    Y = np.where(s2 >= 0, allowables[...,2], allowables[...,3])
+    S = allowables[...,4]
+
+    F = (s1 / X)**2 - s1 * s2 / X**2 + (s2 / Y)**2 + (s6 / S)**2
+    ratio = 1 / np.sqrt(F)
+    return ratio, _quadratic_mode(s1, s2, s6, X, Y, S)
+
+
+def _tsai_wu(stress, allowables):
+    s1 = stress[...,0]
+    s2 = stress[...,1]
+    s6 = stress[...,2]
+    Xt, Xc, Yt, Yc, S = (allowables[...,i] for i in range(5))
+
+    F1 = 1 / Xt - 1 / Xc
+    F2 = 1 / Yt - 1 / Yc
+    F11 = 1 / (Xt * Xc)
+    F22 = 1 / (Yt * Yc)
+    F66 = 1 / (S * S)
+    F12 = -0.5 * np.sqrt(F11 * F22)
+
+    a = F11 * s1 * s1 + F22 * s2 * s2 + F66 * s6 * s6 + 2 * F12 * s1 * s2
+    b = F1 * s1 + F2 * s2
+    ratio = _root(a, b)
+    X = np.where(s1 >= 0, Xt, Xc)
+    Y = np.where(s2 >= 0, Yt, Yc)
+    return ratio, _quadratic_mode(s1, s2, s6, X, Y, S)
+
+
+def _hashin(stress, allowables):
+    s1 = stress[...,0]
+    s2 = stress[...,1]
+    s6 = stress[...,2]
+    Xt, Xc, Yt, Yc, S = (allowables[...,i] for i in range(5))
+    shear = (s6 / S)**2
+
+    # fiber: tension with shear interaction, compression alone
+    fiber = np.where(
+        s1 >= 0,
+        1 / np.sqrt((s1 / Xt)**2 + shear),
+        Xc / np.abs(s1))
+
+    # matrix: tension is quadratic, compression has a linear term
+    tension = 1 / np.sqrt((s2 / Yt)**2 + shear)
+    a = (s2 / (2 * S))**2 + shear
+    b = ((Yc / (2 * S))**2 - 1) * s2 / Yc
+    matrix = np.where(s2 >= 0, tension, _root(a, b))
+
+    ratio = np.minimum(fiber, matrix)
+    mode = np.where(
+        fiber <= matrix,
+        np.where(s1 >= 0, FIBER_TENSION, FIBER_COMPRESSION),
+        np.where(s2 >= 0, MATRIX_TENSION, MATRIX_COMPRESSION))
+    return ratio, mode
+
+
+_CRITERIA = {
+    'max_stress': _max_stress,
+    'max_strain': _max_strain,
+    'tsai_hill': _tsai_hill,
+    'tsai_wu': _tsai_wu,
+    'hashin': _hashin
+}
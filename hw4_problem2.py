@@ -1,8 +1,8 @@
 import numpy as np
 
-from abd import calculate_ABD
+from abd import calculate_ABD, assemble_ABD
 
-A,B,D = calculate_ABD(
+A,B,D, layers = calculate_ABD(
     lam_file='problem2.csv', 
     lam_dir='designlib/hw4/', 
     mat_dir='designlib/hw4/'
@@ -12,10 +12,6 @@ print('A = \n{}\n'.format(A))
 print('B = \n{}\n'.format(B))
 print('D = \n{}'.format(D))
 
-AB = np.append(A,B,axis=1)
-BD = np.append(B,D,axis=1)
-ABD = np.append(AB,BD,axis=0)
-
 # strains
 strains = np.array([
     0.0002,
@@ -27,6 +23,6 @@ strains = np.array([
 ]).T
 
 # allowable loads, matrix multiplication
-loads = ABD @ strains
+loads = assemble_ABD(A, B, D) @ strains
 
 print(loads)
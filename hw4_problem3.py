@@ -1,8 +1,9 @@
 import numpy as np
 
 from abd import calculate_ABD, get_layers
+from solver import LaminateSolver
 
-A,B,D = calculate_ABD(
+A,B,D, layers = calculate_ABD(
     lam_file='problem3.csv', 
     lam_dir='designlib/hw4/', 
     mat_dir='designlib/hw4/'
@@ -18,10 +19,6 @@ layers = get_layers(
 # print('B = \n{}\n'.format(B))
 # print('D = \n{}'.format(D))
 
-AB = np.append(A,B,axis=1)
-BD = np.append(B,D,axis=1)
-ABD = np.append(AB,BD,axis=0)
-
 # applied load
 applied_loads = np.array([
     0,
@@ -33,7 +30,8 @@ applied_loads = np.array([
 ]).T
 
 # allowable loads, matrix multiplication
-strains = np.linalg.inv(ABD) @ applied_loads
+solver = LaminateSolver(A, B, D)
+strains = solver.strains(applied_loads)
 K = strains[3:]
 
 # compute stress in bottom layer
@@ -0,0 +1,210 @@
+import numpy as np
+
+from abd import (
+    Laminate,
+    assemble_ABD
+)
+
+# ABD of a laminate under single-ply edits
+
+
+def ply_moments(Q, z_lower, z_upper):
+    '''Each ply's contribution to A, B, D about z = 0
+    returns: (N,3,3,3) array, [:,0] to A, [:,1] to B, [:,2] to D'''
+    k = np.arange(1, 4)[:,np.newaxis]
+    dz = (z_upper**k - z_lower**k) / k
+    return dz.T[:,:,np.newaxis,np.newaxis] * Q[:,np.newaxis]
+
+
+class IncrementalLaminate:
+    '''Mutable laminate that keeps each ply's contribution to A, B, D
+    Orientation and material edits update the totals by a delta in
+    constant time. Thickness edits, swaps, insertions and removals
+    only recompute the plies whose z changes.
+
+    Contributions are kept about the bottom face, which does not move
+    when plies change, and shifted to the mid-plane by `ABD`.'''
+
+    def __init__(self, laminate):
+        '''Makes an editable copy of `laminate` (an `abd.Laminate`)'''
+        self.orientation = np.array(laminate.orientation, dtype=float)
+        self.thickness = np.array(laminate.thickness, dtype=float)
+        self.material = np.array(laminate.material, dtype=int)
+        self.materials = list(laminate.materials)
+        self.Q = np.array(laminate.Q, dtype=float)
+        self.refresh()
+
+
+    def refresh(self):
+        '''Recomputes every ply contribution and the totals from scratch'''
+        z = np.concatenate(([0], np.cumsum(self.thickness)))
+        self.z = z
+        self.moments = ply_moments(self.Q, z[:-1], z[1:])
+        self.totals = self.moments.sum(axis=0)
+
+
+    def __len__(self):
+        return len(self.orientation)
+
+
+    @property
+    def height(self):
+        '''Total thickness of the laminate'''
+        return self.z[-1]
+
+
+    def ABD(self):
+        '''A, B, D about the mid-plane
+        returns: A, B, D, ABD'''
+        a, b, d = self.totals
+        c = self.height / 2
+        A = a.copy()
+        B = b - c * a
+        D = d - 2 * c * b + c * c * a
+        return A, B, D, assemble_ABD(A, B, D)
+
+
+    def to_laminate(self):
+        '''A new `abd.Laminate` with the current plies'''
+        return Laminate(self.orientation, self.thickness, self.material, self.materials)
+
+
+    def set_orientation(self, i, orientation):
+        '''Rotates ply `i` to `orientation` (degrees)'''
+        i = i % len(self)
+        self.orientation[i] = orientation
+        self._replace_Q(i)
+
+
+    def set_material(self, i, material):
+        '''Changes ply `i` to `material` (a `materials.Material`)'''
+        i = i % len(self)
+        self.material[i] = self._material_index(material)
+        self._replace_Q(i)
+
+
+    def set_thickness(self, i, thickness):
+        '''Changes the thickness of ply `i`
+        Plies above it move, so they are recomputed'''
+        i = i % len(self)
+        self.thickness[i] = thickness
+        self._recompute(i, len(self))
+
+
+    def swap(self, i, j):
+        '''Swaps plies `i` and `j`
+        Plies between them move if the two thicknesses differ'''
+        i, j = sorted((i % len(self), j % len(self)))
+        for arr in (self.orientation, self.thickness, self.material, self.Q):
+            arr[[i, j]] = arr[[j, i]]
+        if self.thickness[i] == self.thickness[j]:
+            self._recompute_plies([i, j])
+        else:
+            self._recompute(i, j + 1)
+
+
+    def insert(self, i, orientation, thickness, material):
+        '''Inserts a new ply below ply `i` (`i` = len adds it on top)'''
+        mat = self._material_index(material)
+        Q = self.materials[mat].rotate(np.array([orientation]))
+        self.orientation = np.insert(self.orientation, i, orientation)
+        self.thickness = np.insert(self.thickness, i, thickness)
+        self.material = np.insert(self.material, i, mat)
+        self.Q = np.insert(self.Q, i, Q, axis=0)
+        self.moments = np.insert(self.moments, i, 0, axis=0)
+        self.z = np.insert(self.z, i, self.z[i])
+        self._recompute(i, len(self))
+
+
+    def remove(self, i):
+        '''Removes ply `i`, plies above it move down'''
+        i = i % len(self)
+        self.totals -= self.moments[i]
+        self.orientation = np.delete(self.orientation, i)
+        self.thickness = np.delete(self.thickness, i)
+        self.material = np.delete(self.material, i)
+        self.Q = np.delete(self.Q, i, axis=0)
+        self.moments = np.delete(self.moments, i, axis=0)
+        self.z = np.delete(self.z, i + 1)
+        self._recompute(i, len(self))
+
+
+    def _material_index(self, material):
+        '''Index of `material` in the table, added if needed'''
+        for index, mat in enumerate(self.materials):
+            if mat is material:
+                return index
+        self.materials.append(material)
+        return len(self.materials) - 1
+
+
+    def _replace_Q(self, i):
+        '''Updates ply `i`'s Q and moves the totals by the difference'''
+        mat = self.materials[self.material[i]]
+        self.Q[i] = mat.rotate(self.orientation[i])
+        self._recompute_plies([i])
+
+
+    def _recompute_plies(self, plies):
+        '''Recomputes the contributions of `plies`, whose z did not change'''
+        plies = np.asarray(plies)
+        new = ply_moments(self.Q[plies], self.z[plies], self.z[plies + 1])
+        self.totals += (new - self.moments[plies]).sum(axis=0)
+        self.moments[plies] = new
+
+
+    def _recompute(self, start, stop):
+        '''Recomputes z and contributions of plies start:stop
+        z below `start` and above `stop` must be unchanged'''
+        z = self.z
+        z[start+1:stop+1] = z[start] + np.cumsum(self.thickness[start:stop])
+        new = ply_moments(self.Q[start:stop], z[start:stop], z[start+1:stop+1])
+        self.totals += (new - self.moments[start:stop]).sum(axis=0)
+        self.moments[start:stop] = new
+
+
+if __name__ == '__main__':
+    from materials import Material
+
+    # random edit sequences checked against a full recompute
+    rng = np.random.RandomState(0)
+    materials = [
+        Material('carbon', 150, 10, 5, 0.3),
+        Material('glass', 40, 9, 4, 0.25)
+    ]
+
+    worst = 0
+    for trial in range(50):
+        n = rng.randint(1, 30)
+        laminate = Laminate(
+            rng.choice([0, 45, -45, 90], n),
+            rng.uniform(0.05, 0.3, n),
+            rng.randint(0, 2, n),
+            materials
+        )
+        lam = IncrementalLaminate(laminate)
+
+        for edit in range(100):
+            i = rng.randint(len(lam))
+            kind = rng.randint(6)
+            if kind == 0:
+                lam.set_orientation(i, rng.uniform(-90, 90))
+            elif kind == 1:
+                lam.set_material(i, materials[rng.randint(2)])
+            elif kind == 2:
+                lam.set_thickness(i, rng.uniform(0.05, 0.3))
+            elif kind == 3:
+                lam.swap(i, rng.randint(len(lam)))
+            elif kind == 4:
+                lam.insert(rng.randint(len(lam) + 1), rng.uniform(-90, 90),
+                    rng.uniform(0.05, 0.3), materials[rng.randint(2)])
+            elif len(lam) > 1:
+                lam.remove(i)
+
+            expected = lam.to_laminate().ABD()[3]
+            actual = lam.ABD()[3]
+            error = np.abs(actual - expected).max() / np.abs(expected).max()
+            worst = max(worst, error)
+            assert error < 1e-10, f'trial {trial}, edit {edit}: error {error}'
+
+    print(f'incremental ABD matches full recompute, worst relative error {worst:.2e}')
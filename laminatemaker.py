@@ -1,4 +1,5 @@
 
+import os
 from pathlib import Path
 
 import tkinter as tk
@@ -6,7 +7,7 @@ from tkinter import filedialog
 
 from entrytable import EntryTable
 from materialeditor import ABDInputFrame
-from abd import calculate_ABD
+from abd import Laminate
 
 
 class LaminateMaker(tk.Frame):
@@ -84,21 +85,16 @@ class LaminateMaker(tk.Frame):
 
 
     def view_abd(self, event=None):
-        '''Computes ABD matrix and shows it'''
-        try:
-            path = self._save_path
-            if path is None:
-                raise ValueError
-        except:
-            self.save_as()
-
-        path = Path(path)
+        '''Computes ABD matrix from the table and shows it
+        Materials are read from the directory of the saved file'''
+        path = getattr(self, '_save_path', None)
+        if path:
+            mat_dir = os.path.join(str(Path(path).parent), '')
+        else:
+            mat_dir = ''
 
-        A, B, D, _ = calculate_ABD(
-            lam_file=path.parts[-1], 
-            lam_dir=str(path.parent) + '\\', 
-            mat_dir=str(path.parent) + '\\'
-        )
+        laminate = Laminate.from_rows(self.table.data_rows(), mat_dir)
+        A, B, D, _ = laminate.ABD()
         t = tk.Toplevel(self)
         abd = ABDInputFrame(t)
         abd.display_mode = True
@@ -0,0 +1,125 @@
+import numpy as np
+
+from abd import assemble_ABD
+
+# lamination parameters: a laminate's stacking sequence in 12 numbers
+#
+# xi1-4   in-plane:  1/h    sum (z_upper   - z_lower)   [cos2t, sin2t, cos4t, sin4t]
+# xi5-8   coupling:  2/h^2  sum (z_upper^2 - z_lower^2) [...]
+# xi9-12  bending:   4/h^3  sum (z_upper^3 - z_lower^3) [...]
+#
+# For a single material with invariants U1-U5 (stiffness.invariants)
+# A = h (G0 + xi1 G1 + xi2 G2 + xi3 G3 + xi4 G4)
+# B = h^2/4 (xi5 G1 + ... + xi8 G4)
+# D = h^3/12 (G0 + xi9 G1 + ... + xi12 G4)
+# where the G matrices are linear in the invariants (`stiffness_basis`).
+
+
+def trig_terms(orientation):
+    '''cos2t, sin2t, cos4t, sin4t of `orientation` (degrees)
+    returns: array of shape orientation.shape + (4,)'''
+    t = np.asarray(orientation, dtype=float) * np.pi / 180
+    return np.stack((np.cos(2*t), np.sin(2*t), np.cos(4*t), np.sin(4*t)), axis=-1)
+
+
+def lamination_parameters(laminate):
+    '''Lamination parameters of `laminate` (an `abd.Laminate`)
+    returns: (12,) xi, total thickness h'''
+    return ply_lamination_parameters(laminate.orientation, laminate.z_lower, laminate.z_upper)
+
+
+def ply_lamination_parameters(orientation, z_lower, z_upper):
+    '''Lamination parameters of plies at `orientation` (degrees)
+    between `z_lower` and `z_upper`, measured from the mid-plane
+    returns: (12,) xi, total thickness h'''
+    z_lower = np.asarray(z_lower, dtype=float)
+    z_upper = np.asarray(z_upper, dtype=float)
+    h = z_upper[-1] - z_lower[0]
+
+    k = np.arange(1, 4)[:,np.newaxis]
+    dz = (z_upper**k - z_lower**k) * (2**(k - 1) / h**k)
+    xi = dz @ trig_terms(orientation)
+    return xi.ravel(), h
+
+
+def batch_lamination_parameters(batch):
+    '''Lamination parameters of every laminate of a `batch.LaminateBatch`
+    returns: (K,12) xi, (K,) total thickness h'''
+    starts = batch.offsets[:-1]
+    z_lower = batch.z_lower.astype(np.float64)
+    z_upper = batch.z_upper.astype(np.float64)
+    h = np.add.reduceat(z_upper - z_lower, starts)
+    trig = trig_terms(batch.orientation)
+
+    xi = np.empty((len(batch), 12))
+    for k in range(1, 4):
+        dz = z_upper**k - z_lower**k
+        sums = np.add.reduceat(dz[:,np.newaxis] * trig, starts, axis=0)
+        xi[:,4*(k-1):4*k] = sums * (2**(k - 1) / h**k)[:,np.newaxis]
+    return xi, h
+
+
+def stiffness_basis(U):
+    '''G0-G4 matrices of invariants `U` ((5,) or (M,5))
+    returns: (...,5,3,3) array'''
+    U = np.asarray(U, dtype=float)
+    U1, U2, U3, U4, U5 = np.moveaxis(U, -1, 0)
+    G = np.zeros(U.shape[:-1] + (5, 3, 3))
+
+    G[...,0,0,0] = U1
+    G[...,0,1,1] = U1
+    G[...,0,0,1] = U4
+    G[...,0,1,0] = U4
+    G[...,0,2,2] = U5
+
+    G[...,1,0,0] = U2
+    G[...,1,1,1] = -U2
+
+    G[...,2,0,2] = U2 / 2
+    G[...,2,1,2] = U2 / 2
+    G[...,2,2,0] = U2 / 2
+    G[...,2,2,1] = U2 / 2
+
+    G[...,3,0,0] = U3
+    G[...,3,1,1] = U3
+    G[...,3,0,1] = -U3
+    G[...,3,1,0] = -U3
+    G[...,3,2,2] = -U3
+
+    G[...,4,0,2] = U3
+    G[...,4,2,0] = U3
+    G[...,4,1,2] = -U3
+    G[...,4,2,1] = -U3
+    return G
+
+
+def ABD_from_lamination_parameters(xi, h, U):
+    '''A, B, D of laminates from their lamination parameters
+    `xi` is (K,12) with thicknesses `h` (K,), `U` the invariants of one
+    material (5,) or of M materials (M,5), which gives (K,M,...) results.
+    Evaluating many laminates is one matrix multiply.
+    returns: A, B, D, ABD'''
+    xi = np.atleast_2d(np.asarray(xi, dtype=float))
+    h = np.atleast_1d(np.asarray(h, dtype=float))[:,np.newaxis]
+    K = len(xi)
+
+    # weights of G0-G4 in A, B and D
+    weights = np.zeros((K, 3, 5))
+    weights[:,0,0] = 1
+    weights[:,0,1:] = xi[:,0:4]
+    weights[:,1,1:] = xi[:,4:8]
+    weights[:,2,0] = 1
+    weights[:,2,1:] = xi[:,8:12]
+    weights *= np.concatenate((h, h**2 / 4, h**3 / 12), axis=1)[:,:,np.newaxis]
+
+    G = stiffness_basis(U)
+    G = G.reshape(G.shape[:-2] + (9,))
+    if G.ndim == 2:
+        ABD3 = weights @ G
+    else:
+        ABD3 = np.einsum('kas,msn->kman', weights, G)
+    ABD3 = ABD3.reshape(ABD3.shape[:-1] + (3, 3))
+    A = ABD3[...,0,:,:]
+    B = ABD3[...,1,:,:]
+    D = ABD3[...,2,:,:]
+    return A, B, D, assemble_ABD(A, B, D)
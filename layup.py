@@ -0,0 +1,252 @@
+import numpy as np
+
+from abd import (
+    Laminate,
+    assemble_ABD
+)
+
+# stacking sequences in standard layup notation
+#
+# [0/±45/90]_4s    plies separated by '/', listed from the bottom up
+# ±45, ∓45         a +45/-45 (or -45/+45) pair, '+-' and '-+' also work
+# 0_2, (±45)_3     repeat a ply or a parenthesized group n times
+# [...]_s, [...]s  symmetric: the sequence then its mirror image
+# [...]_2s, [...]4 repeat, then mirror; a trailing T is ignored
+
+
+class Ply:
+    '''A single ply of a layup'''
+
+    def __init__(self, angle):
+        self.angle = angle
+
+    def __repr__(self):
+        return f'Ply({self.angle:g})'
+
+
+class Group:
+    '''Plies in sequence, repeated `count` times, then mirrored if `symmetric`'''
+
+    def __init__(self, items, count=1, symmetric=False):
+        self.items = items
+        self.count = count
+        self.symmetric = symmetric
+
+    def __repr__(self):
+        return f'Group({self.items!r}, count={self.count}, symmetric={self.symmetric})'
+
+
+def parse(notation):
+    '''Parses layup `notation` into a tree of Ply and Group'''
+    return _Parser(notation).layup()
+
+
+class _Parser:
+    '''Recursive descent parser for layup notation'''
+
+    signs = {'±': (1, -1), '+-': (1, -1), '∓': (-1, 1), '-+': (-1, 1)}
+
+    def __init__(self, text):
+        self.text = ''.join(text.split())
+        self.pos = 0
+
+    def error(self, message):
+        raise ValueError(f'{message} at position {self.pos} of layup: {self.text}')
+
+    def peek(self, n=1):
+        return self.text[self.pos:self.pos+n]
+
+    def expect(self, char):
+        if self.peek() != char:
+            self.error(f"expected '{char}'")
+        self.pos += 1
+
+    def layup(self):
+        '''[sequence]suffix'''
+        if self.peek() == '[':
+            self.pos += 1
+            items = self.sequence()
+            self.expect(']')
+            count, symmetric = self.suffix()
+            if self.peek().upper() == 'T':
+                self.pos += 1
+            group = Group(items, count, symmetric)
+        else:
+            group = Group(self.sequence())
+        if self.pos != len(self.text):
+            self.error('unexpected text')
+        return group
+
+    def sequence(self):
+        '''item/item/...'''
+        items = [self.item()]
+        while self.peek() == '/':
+            self.pos += 1
+            items.append(self.item())
+        return items
+
+    def item(self):
+        '''(sequence)suffix or a ply with an optional _n'''
+        if self.peek() == '(':
+            self.pos += 1
+            items = self.sequence()
+            self.expect(')')
+            count, symmetric = self.suffix()
+            return Group(items, count, symmetric)
+
+        # a ± pair is a group of two plies
+        for sign, (first, second) in self.signs.items():
+            if self.peek(len(sign)) == sign:
+                self.pos += len(sign)
+                angle = self.number()
+                item = Group([Ply(first * angle), Ply(second * angle)])
+                break
+        else:
+            item = Ply(self.number(signed=True))
+
+        if self.peek() == '_':
+            self.pos += 1
+            count = self.integer()
+            item = Group([item], count)
+        return item
+
+    def suffix(self):
+        '''optional _, count and s after a bracket'''
+        if self.peek() == '_':
+            self.pos += 1
+            if not (self.peek().isdigit() or self.peek().lower() == 's'):
+                self.error("expected a count or 's' after '_'")
+        count = self.integer() if self.peek().isdigit() else 1
+        symmetric = self.peek().lower() == 's'
+        if symmetric:
+            self.pos += 1
+        return count, symmetric
+
+    def integer(self):
+        start = self.pos
+        while self.peek().isdigit():
+            self.pos += 1
+        if start == self.pos:
+            self.error('expected a count')
+        count = int(self.text[start:self.pos])
+        if count < 1:
+            self.error('counts must be at least 1')
+        return count
+
+    def number(self, signed=False):
+        start = self.pos
+        if signed and self.peek() in '+-':
+            self.pos += 1
+        while self.peek().isdigit() or self.peek() == '.':
+            self.pos += 1
+        try:
+            return float(self.text[start:self.pos])
+        except ValueError:
+            self.pos = start
+            self.error('expected a ply angle')
+
+
+def expand(notation):
+    '''Ply angles of layup `notation`, bottom up'''
+    tree = parse(notation) if isinstance(notation, str) else notation
+    return _expand(tree)
+
+
+def _expand(item):
+    if isinstance(item, Ply):
+        return [item.angle]
+    angles = []
+    for child in item.items:
+        angles += _expand(child)
+    angles = angles * item.count
+    if item.symmetric:
+        angles = angles + angles[::-1]
+    return angles
+
+
+def ply_count(notation):
+    '''Number of plies of layup `notation`, without expanding it'''
+    tree = parse(notation) if isinstance(notation, str) else notation
+    return _ply_count(tree)
+
+
+def _ply_count(item):
+    if isinstance(item, Ply):
+        return 1
+    n = sum(_ply_count(child) for child in item.items) * item.count
+    return 2 * n if item.symmetric else n
+
+
+def layup_laminate(notation, thickness, material):
+    '''Expanded `abd.Laminate` of layup `notation`
+    All plies have `thickness` and `material`'''
+    return Laminate.from_plies(expand(notation), thickness, material)
+
+
+def layup_ABD(notation, thickness, material):
+    '''A, B, D of layup `notation` without expanding its plies
+    All plies have `thickness` and `material` (a `materials.Material`).
+    Repeats scale in closed form and a symmetric half is integrated once,
+    so the cost grows with the length of the notation, not the ply count.
+    returns: A, B, D, ABD'''
+    tree = parse(notation) if isinstance(notation, str) else notation
+    angles = np.array(sorted(_unique_angles(tree)))
+    Q = dict(zip(angles, material.rotate(angles)))
+
+    a, b, d, h = _block(tree, Q, float(thickness))
+
+    # moments about the bottom face to the mid-plane
+    c = h / 2
+    A = a
+    B = b - c * a
+    D = d - 2 * c * b + c * c * a
+    return A, B, D, assemble_ABD(A, B, D)
+
+
+def _unique_angles(item):
+    if isinstance(item, Ply):
+        return {item.angle}
+    return set().union(*(_unique_angles(child) for child in item.items))
+
+
+def _block(item, Q, t):
+    '''Moments of a layup block about its bottom face
+    returns: a = sum Q dz, b = sum Q dz^2 / 2, d = sum Q dz^3 / 3, height'''
+    if isinstance(item, Ply):
+        q = Q[item.angle]
+        return q * t, q * t**2 / 2, q * t**3 / 3, t
+
+    # stack the items one on top of the other
+    a, b, d, h = _block(item.items[0], Q, t)
+    for child in item.items[1:]:
+        a, b, d, h = _stack((a, b, d, h), _block(child, Q, t))
+
+    # n copies, each shifted up by k*h for k = 0..n-1
+    n = item.count
+    if n > 1:
+        s1 = n * (n - 1) / 2
+        s2 = (n - 1) * n * (2*n - 1) / 6
+        a, b, d, h = (
+            n * a,
+            n * b + s1 * h * a,
+            n * d + 2 * s1 * h * b + s2 * h * h * a,
+            n * h
+        )
+
+    # the block flipped upside down on top of itself
+    if item.symmetric:
+        mirror = (a, h * a - b, h * h * a - 2 * h * b + d, h)
+        a, b, d, h = _stack((a, b, d, h), mirror)
+    return a, b, d, h
+
+
+def _stack(lower, upper):
+    '''Moments of block `upper` placed on top of block `lower`'''
+    a1, b1, d1, h1 = lower
+    a2, b2, d2, h2 = upper
+    return (
+        a1 + a2,
+        b1 + b2 + h1 * a2,
+        d1 + d2 + 2 * h1 * b2 + h1 * h1 * a2,
+        h1 + h2
+    )
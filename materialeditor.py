@@ -245,6 +245,11 @@ class MaterialEditor(tk.Frame):
         # add modulus to main material
         mat['modulus'] = mod
 
+        # the form does not edit allowables, keep any from the opened file
+        strength = getattr(self, '_strength', None)
+        if strength is not None:
+            mat['strength'] = strength
+
         # write
         with open(filename, 'w') as f:
             json.dump(mat, f, indent=4)
@@ -274,6 +279,7 @@ class MaterialEditor(tk.Frame):
 
         # set material name
         self.name_entry.text.set(mat['name'])
+        self._strength = mat.get('strength')
 
         # set radio button
         self.radio.set(mat['modulus']['radio'])
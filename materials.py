@@ -0,0 +1,189 @@
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from stiffness import (
+    make_Q,
+    invariants,
+    RotationTable
+)
+
+# ply materials
+
+
+# ply allowables in material axes, all positive:
+# stresses Xt, Xc (fiber), Yt, Yc (transverse), S (in-plane shear) and
+# strains e1t, e1c, e2t, e2c, g12 (engineering shear)
+Strength = namedtuple('Strength', 'Xt, Xc, Yt, Yc, S, e1t, e1c, e2t, e2c, g12')
+
+
+class Material:
+    '''Ply material: lamina properties, nominal Q matrix and its rotations'''
+
+    __slots__ = ('name', 'E1', 'E2', 'G12', 'v12', 'Q', 'U', 'rotation_table', 'strength')
+
+    def __init__(self, name, E1, E2, G12, v12, Q=None, strength=None, angles=None, table=None):
+        '''Makes a material from lamina level properties
+        The Q matrix is made from them unless given
+        `strength` is a Strength of allowables, or None if unknown
+        `angles` are custom angles (degrees) added to the rotation table,
+        or `table` is the path of a table saved with `RotationTable.save`'''
+        self.name = name
+        self.E1 = float(E1)
+        self.E2 = float(E2)
+        self.G12 = float(G12)
+        self.v12 = float(v12)
+        self.strength = strength
+        if Q is None:
+            Q = make_Q(self.E1, self.E2, self.G12, self.v12)
+        self.Q = np.array(Q, dtype=float)
+        self.U = invariants(self.Q)
+        if table is not None:
+            self.rotation_table = RotationTable.load(table)
+            if not np.allclose(self.rotation_table.Q_nominal, self.Q):
+                raise ValueError(f'rotation table {table} is for a different Q matrix')
+            if angles is not None:
+                self.rotation_table = RotationTable(
+                    self.Q,
+                    np.append(self.rotation_table.angles, angles),
+                    self.rotation_table.tol
+                )
+        else:
+            self.rotation_table = RotationTable(self.Q, () if angles is None else angles)
+
+        # arrays are shared by every ply of this material
+        for arr in (self.Q, self.U, self.rotation_table.Q_nominal,
+                    self.rotation_table.U, self.rotation_table.Q):
+            arr.setflags(write=False)
+
+
+    def rotate(self, orientation):
+        '''Rotated Q matrices at each of `orientation` (degrees)'''
+        return self.rotation_table.lookup(orientation)
+
+
+def read_material(fp, name=None, angles=None, table=None):
+    '''reads the material json file at `fp`
+    `name` defaults to the name stored in the file
+    `angles` and `table` are passed on to `Material`'''
+    with open(fp, 'r') as f:
+        mat = json.load(f)
+
+    if name is None:
+        name = mat.get('name')
+
+    mod = mat['modulus']
+    try:
+        Q = np.array(mod['Q'], dtype=float)
+    except:
+        Q = None
+
+    strength = None
+    if 'strength' in mat:
+        strength = read_strength(mat['strength'], mod['E1'], mod['E2'], mod['G12'])
+
+    return Material(
+        name,
+        mod['E1'],
+        mod['E2'],
+        mod['G12'],
+        mod['v12'],
+        Q,
+        strength,
+        angles,
+        table
+    )
+
+
+def read_strength(values, E1, E2, G12):
+    '''Strength from the `strength` block of a material file
+    Stress allowables Xt, Xc, Yt, Yc and S are required. Missing strain
+    allowables are taken as the stress allowables over the modulus.'''
+    try:
+        Xt, Xc, Yt, Yc, S = (abs(float(values[key])) for key in Strength._fields[:5])
+    except KeyError as e:
+        raise ValueError(f'strength block is missing {e}') from None
+
+    # linear to failure unless strain allowables are given
+    E1, E2, G12 = float(E1), float(E2), float(G12)
+    default = {
+        'e1t': Xt / E1,
+        'e1c': Xc / E1,
+        'e2t': Yt / E2,
+        'e2c': Yc / E2,
+        'g12': S / G12
+    }
+    strains = (abs(float(values.get(key, default[key]))) for key in Strength._fields[5:])
+    return Strength(Xt, Xc, Yt, Yc, S, *strains)
+
+
+class MaterialLibrary:
+    '''Materials stored as `<materialname>.json` files under `mat_dir`
+    `mat_dir` is a path prefix, the same as the `mat_dir` strings of `abd`.
+    Files are indexed once, each is parsed on first use and parsed again
+    only when its modification time changes. Every material's rotation
+    table also holds the custom `angles` (degrees).'''
+
+    def __init__(self, mat_dir='', angles=None):
+        '''Makes a library and indexes the files under `mat_dir`'''
+        self.mat_dir = mat_dir
+        self.angles = angles
+        self._paths = {}
+        self._cache = {}
+        self.index()
+
+
+    def index(self):
+        '''Indexes the material files in the directory'''
+        directory, prefix = os.path.split(self.mat_dir)
+        self._paths = {}
+        for entry in os.scandir(directory or '.'):
+            if (entry.is_file()
+                    and entry.name.startswith(prefix)
+                    and entry.name.endswith('.json')):
+                name = entry.name[len(prefix):-len('.json')]
+                self._paths[name] = entry.path
+
+
+    def __contains__(self, name):
+        return name in self._paths
+
+
+    def __iter__(self):
+        return iter(self._paths)
+
+
+    def __len__(self):
+        return len(self._paths)
+
+
+    def __getitem__(self, name):
+        '''The material called `name`, read from disk only if needed'''
+        if name not in self._paths:
+            # the file may have been added since indexing
+            path = self.mat_dir + name + '.json'
+            if not os.path.isfile(path):
+                raise KeyError(f'material not found: {name}')
+            self._paths[name] = path
+
+        path = self._paths[name]
+        mtime = os.stat(path).st_mtime_ns
+        try:
+            cached_mtime, material = self._cache[name]
+        except KeyError:
+            cached_mtime = None
+
+        if cached_mtime != mtime:
+            material = read_material(path, name, self.angles)
+            self._cache[name] = (mtime, material)
+        return material
+
+
+def as_library(mat_dir):
+    '''`mat_dir` as a MaterialLibrary
+    Accepts a library or a directory prefix string'''
+    if isinstance(mat_dir, MaterialLibrary):
+        return mat_dir
+    return MaterialLibrary(mat_dir)
@@ -0,0 +1,387 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from abd import Laminate
+from batch import LaminateBatch, batch_ABD
+
+# genetic algorithm for stacking sequences
+#
+# Each individual has an angle gene and a material gene for every ply slot
+# and a ply-count gene saying how many slots are in use. Slot 0 is the
+# bottom ply. Symmetric laminates only encode their lower half, so the
+# upper half always mirrors it. Balance, contiguity and the 10% rule are
+# restored by repair operators after crossover and mutation; anything
+# repair cannot fix scores inf.
+
+
+class GeneticOptimizer:
+    '''Genetic algorithm over stacking sequences
+    Fitness is `objective(ABD, compliance, batch)`, scoring a whole
+    `batch.LaminateBatch` of the population at once, lower is better.
+    The population is split over `processes` worker processes, so the
+    objective and materials must be picklable if `processes` > 1.
+    Runs with the same `seed` give the same result, also when resumed
+    from a checkpoint.'''
+
+    def __init__(self, angles, materials, thickness, objective, max_plies, min_plies=None,
+                 symmetric=True, balanced=True, max_contiguous=4, min_fraction=0.1,
+                 rule_angles=None, population=100, elite=2, tournament=3,
+                 crossover=0.9, mutation=None, count_mutation=0.2, processes=1, chunk=32,
+                 seed=None):
+        '''`angles`          allowed ply angles (degrees)
+        `materials`       allowed materials (`materials.Material`)
+        `thickness`       ply thickness, or one per material
+        `max_plies`       most plies in a laminate, `min_plies` the fewest
+        `symmetric`       only mirror-symmetric laminates (even ply counts)
+        `balanced`        as many -t as +t plies for every +-t pair in `angles`
+        `max_contiguous`  most adjacent plies of one angle, None for no limit
+        `min_fraction`    least share of the plies at each of `rule_angles`
+                          (default: whichever of 0, 45, -45, 90 are allowed)
+        `population`, `elite`, `tournament`  population size, individuals
+                          kept unchanged each generation, tournament size
+        `crossover`       chance two parents exchange genes (one point)
+        `mutation`        chance of changing each gene, default 1 / slots
+        `count_mutation`  chance of adding or removing a ply slot
+        `chunk`           individuals evaluated per batch (and task)'''
+        self.angles = np.asarray(angles, dtype=float)
+        self.materials = list(materials)
+        self.thickness = np.broadcast_to(
+            np.asarray(thickness, dtype=float), (len(self.materials),))
+        self.objective = objective
+        self.symmetric = symmetric
+        self.balanced = balanced
+        self.max_contiguous = max_contiguous
+        self.min_fraction = min_fraction
+        self.population = population
+        self.elite = elite
+        self.tournament = tournament
+        self.crossover = crossover
+        self.count_mutation = count_mutation
+        self.processes = processes
+        self.chunk = chunk
+        self._pool = None
+
+        if min_plies is None:
+            min_plies = max_plies
+        scale = 2 if symmetric else 1
+        self.slots = max_plies // scale
+        self.min_slots = -(-min_plies // scale)
+        if not 1 <= self.min_slots <= self.slots:
+            raise ValueError('need 1 <= min_plies <= max_plies')
+        self.mutation = 1 / self.slots if mutation is None else mutation
+
+        # +-t pairs for balance, the angles under the 10% rule, and an
+        # angle to turn a lone off-axis ply into
+        index = {angle: i for i, angle in enumerate(self.angles)}
+        self.pairs = [
+            (index[angle], index[-angle]) for angle in self.angles
+            if angle > 0 and angle % 90 != 0 and -angle in index
+        ]
+        if rule_angles is None:
+            rule_angles = [angle for angle in (0, 45, -45, 90) if angle in index]
+        self.rule = [index[angle] for angle in rule_angles]
+        on_axis = [i for i, angle in enumerate(self.angles) if angle % 90 == 0]
+        self.on_axis = on_axis[0] if on_axis else None
+
+        self.rng = np.random.RandomState(seed)
+        self.generation = 0
+        self.history = []
+        self.angle = None
+        self.material = None
+        self.count = None
+        self.fitness = None
+
+
+    def initialize(self):
+        '''Random initial population, repaired and evaluated'''
+        P = self.population
+        self.angle = self.rng.randint(len(self.angles), size=(P, self.slots))
+        self.material = self.rng.randint(len(self.materials), size=(P, self.slots))
+        self.count = self.rng.randint(self.min_slots, self.slots + 1, size=P)
+        self.repair(self.angle, self.material, self.count)
+        self.fitness = self.evaluate(self.angle, self.material, self.count)
+        self.generation = 0
+        self.history = [float(self.fitness.min())]
+
+
+    def decode(self, angle, material, count):
+        '''Flat ply arrays of individuals, as `batch.LaminateBatch` takes them
+        returns: orientation, thickness, material, plies per laminate'''
+        plies = 2 * count if self.symmetric else count
+        individual = np.repeat(np.arange(len(count)), plies)
+        within = np.arange(plies.sum()) - np.repeat(np.cumsum(plies) - plies, plies)
+        if self.symmetric:
+            half = np.repeat(count, plies)
+            within = np.where(within < half, within, 2 * half - 1 - within)
+        mat = material[individual, within]
+        return self.angles[angle[individual, within]], self.thickness[mat], mat, plies
+
+
+    def laminate(self, i):
+        '''Individual `i` of the population as an `abd.Laminate`'''
+        orientation, thickness, material, _ = self.decode(
+            self.angle[i:i+1], self.material[i:i+1], self.count[i:i+1])
+        return Laminate(orientation, thickness, material, self.materials)
+
+
+    def best(self):
+        '''Best individual found so far
+        returns: abd.Laminate, its fitness'''
+        i = int(np.argmin(self.fitness))
+        return self.laminate(i), float(self.fitness[i])
+
+
+    def evaluate(self, angle, material, count):
+        '''Fitness of individuals, in batches of `chunk`
+        Batches are spread over the worker processes while `run` is going
+        returns: (P,) fitness, inf where constraints are violated'''
+        orientation, thickness, mat, plies = self.decode(angle, material, count)
+        offsets = np.concatenate(([0], np.cumsum(plies)))
+
+        # batches of a fixed size, so results do not depend on the
+        # number of processes
+        tasks = []
+        for start in range(0, len(count), self.chunk):
+            stop = min(start + self.chunk, len(count))
+            lo, hi = offsets[start], offsets[stop]
+            tasks.append((orientation[lo:hi], thickness[lo:hi], plies[start:stop],
+                          mat[lo:hi], self.materials, self.objective))
+
+        if self._pool is not None:
+            parts = list(self._pool.map(_fitness, tasks))
+        else:
+            parts = [_fitness(task) for task in tasks]
+        fitness = np.concatenate(parts)
+
+        feasible = np.array([
+            self.feasible(angle[i, :count[i]]) for i in range(len(count))
+        ], dtype=bool)
+        fitness[~feasible] = np.inf
+        return fitness
+
+
+    def feasible(self, genes):
+        '''Whether the angle genes in use meet every constraint'''
+        return self.feasible_counts(genes) and self.excess_run(genes) == 0
+
+
+    def feasible_counts(self, genes):
+        '''Whether the balance and 10% rule hold'''
+        counts = np.bincount(genes, minlength=len(self.angles))
+        if self.balanced and any(counts[p] != counts[m] for p, m in self.pairs):
+            return False
+        needed = self.min_fraction * len(genes)
+        return all(counts[i] >= needed for i in self.rule)
+
+
+    def sequence(self, genes):
+        '''Ply angle indices of the whole laminate from its angle genes'''
+        if self.symmetric:
+            return np.concatenate((genes, genes[::-1]))
+        return genes
+
+
+    def excess_run(self, genes):
+        '''Plies beyond `max_contiguous` in runs of one angle'''
+        if self.max_contiguous is None:
+            return 0
+        seq = self.sequence(genes)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(seq)) + 1, [len(seq)]))
+        return int(np.maximum(np.diff(starts) - self.max_contiguous, 0).sum())
+
+
+    def repair(self, angle, material, count):
+        '''Restores the constraints of every individual, in place'''
+        for i in range(len(count)):
+            genes = angle[i, :count[i]]
+            for _ in range(3):
+                self.repair_fraction(genes)
+                self.repair_balance(genes)
+                if self.feasible_counts(genes):
+                    break
+            self.repair_contiguity(genes, material[i, :count[i]])
+
+
+    def repair_fraction(self, genes):
+        '''Raises each rule angle to its least share, taking plies
+        from the angle with the most to spare'''
+        if self.min_fraction == 0 or not self.rule:
+            return
+        needed = int(np.ceil(self.min_fraction * len(genes)))
+        floor = np.zeros(len(self.angles), dtype=int)
+        floor[self.rule] = needed
+        for i in self.rule:
+            counts = np.bincount(genes, minlength=len(self.angles))
+            for _ in range(needed - counts[i]):
+                spare = counts - floor
+                donor = int(np.argmax(spare))
+                if spare[donor] <= 0:
+                    return
+                j = self.rng.choice(np.flatnonzero(genes == donor))
+                genes[j] = i
+                counts[donor] -= 1
+                counts[i] += 1
+
+
+    def repair_balance(self, genes):
+        '''Flips surplus +t (or -t) plies to the other sign; an odd one
+        out goes on-axis'''
+        if not self.balanced:
+            return
+        for p, m in self.pairs:
+            counts = np.bincount(genes, minlength=len(self.angles))
+            surplus, short = (p, m) if counts[p] > counts[m] else (m, p)
+            diff = abs(int(counts[p]) - int(counts[m]))
+            if diff == 0:
+                continue
+            plies = self.rng.permutation(np.flatnonzero(genes == surplus))
+            genes[plies[:diff // 2]] = short
+            if diff % 2 and self.on_axis is not None:
+                genes[plies[diff // 2]] = self.on_axis
+
+
+    def repair_contiguity(self, genes, material):
+        '''Breaks up long runs of one angle by swapping plies, which
+        keeps the ply counts (and so balance and the 10% rule)'''
+        excess = self.excess_run(genes)
+        for _ in range(2 * len(genes)):
+            if excess == 0:
+                return
+            seq = self.sequence(genes)
+            starts = np.concatenate(([0], np.flatnonzero(np.diff(seq)) + 1))
+            lengths = np.diff(np.concatenate((starts, [len(seq)])))
+            run = np.argmax(lengths > self.max_contiguous)
+            k = starts[run] + self.max_contiguous
+            if k >= len(genes):
+                k = 2 * len(genes) - 1 - k
+
+            # the first swap partner that shortens the runs
+            for j in self.rng.permutation(np.flatnonzero(genes != genes[k])):
+                genes[[k, j]] = genes[[j, k]]
+                material[[k, j]] = material[[j, k]]
+                new = self.excess_run(genes)
+                if new < excess:
+                    excess = new
+                    break
+                genes[[k, j]] = genes[[j, k]]
+                material[[k, j]] = material[[j, k]]
+            else:
+                return
+
+
+    def select(self, n):
+        '''Indices of `n` parents, by tournament'''
+        entrants = self.rng.randint(len(self.fitness), size=(n, self.tournament))
+        return entrants[np.arange(n), np.argmin(self.fitness[entrants], axis=1)]
+
+
+    def step(self):
+        '''Advances the population one generation'''
+        P = self.population
+        n = P - self.elite
+        n_pairs = (n + 1) // 2
+
+        parents = self.select(2 * n_pairs).reshape(2, n_pairs)
+        angle = self.angle[parents].copy()
+        material = self.material[parents].copy()
+        count = self.count[parents].copy()
+
+        # one-point crossover of the slot genes
+        cross = self.rng.random_sample(n_pairs) < self.crossover
+        point = self.rng.randint(1, max(self.slots, 2), size=n_pairs)
+        tail = (np.arange(self.slots) >= point[:,np.newaxis]) & cross[:,np.newaxis]
+        for genes in (angle, material):
+            swapped = np.where(tail, genes[1], genes[0])
+            genes[1] = np.where(tail, genes[0], genes[1])
+            genes[0] = swapped
+
+        angle = angle.reshape(-1, self.slots)[:n]
+        material = material.reshape(-1, self.slots)[:n]
+        count = count.ravel()[:n]
+
+        # mutation of angles, materials and ply count
+        mutate = self.rng.random_sample(angle.shape) < self.mutation
+        shift = self.rng.randint(1, max(len(self.angles), 2), size=angle.shape)
+        angle[mutate] = (angle[mutate] + shift[mutate]) % len(self.angles)
+        if len(self.materials) > 1:
+            mutate = self.rng.random_sample(material.shape) < self.mutation
+            material[mutate] = self.rng.randint(len(self.materials), size=mutate.sum())
+        mutate = self.rng.random_sample(n) < self.count_mutation
+        step = self.rng.choice([-1, 1], size=n)
+        count = np.where(mutate, np.clip(count + step, self.min_slots, self.slots), count)
+
+        self.repair(angle, material, count)
+        fitness = self.evaluate(angle, material, count)
+
+        # the elite carry over unchanged
+        elite = np.argsort(self.fitness, kind='stable')[:self.elite]
+        self.angle = np.concatenate((self.angle[elite], angle))
+        self.material = np.concatenate((self.material[elite], material))
+        self.count = np.concatenate((self.count[elite], count))
+        self.fitness = np.concatenate((self.fitness[elite], fitness))
+        self.generation += 1
+        self.history.append(float(self.fitness.min()))
+
+
+    def run(self, generations, checkpoint=None, every=10):
+        '''Runs `generations` more generations
+        Saves to `checkpoint` every `every` generations and at the end
+        returns: abd.Laminate of the best individual, its fitness'''
+        if self.processes is None or self.processes > 1:
+            self._pool = ProcessPoolExecutor(self.processes)
+        try:
+            if self.fitness is None:
+                self.initialize()
+            for g in range(generations):
+                self.step()
+                if checkpoint is not None and (g + 1) % every == 0:
+                    self.save(checkpoint)
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+        if checkpoint is not None:
+            self.save(checkpoint)
+        return self.best()
+
+
+    def save(self, fp):
+        '''Saves the population and random state to `fp` (.npz)'''
+        _, keys, pos, has_gauss, cached_gaussian = self.rng.get_state()
+        np.savez(
+            fp,
+            angle=self.angle,
+            material=self.material,
+            count=self.count,
+            fitness=self.fitness,
+            generation=self.generation,
+            history=np.array(self.history),
+            rng_keys=keys,
+            rng_state=np.array([pos, has_gauss, cached_gaussian])
+        )
+
+
+    def load(self, fp):
+        '''Resumes from a checkpoint saved by `save`
+        The optimizer must have the settings the checkpoint was made with'''
+        with np.load(fp) as data:
+            if data['angle'].shape[1] != self.slots:
+                raise ValueError('checkpoint has a different number of ply slots')
+            self.angle = data['angle']
+            self.material = data['material']
+            self.count = data['count']
+            self.fitness = data['fitness']
+            self.generation = int(data['generation'])
+            self.history = data['history'].tolist()
+            pos, has_gauss, cached_gaussian = data['rng_state']
+            self.rng.set_state(
+                ('MT19937', data['rng_keys'], int(pos), int(has_gauss), float(cached_gaussian)))
+
+
+def _fitness(task):
+    '''Scores one batch of laminates with the objective'''
+    orientation, thickness, counts, material, materials, objective = task
+    batch = LaminateBatch(orientation, thickness, counts, material, materials)
+    ABD, compliance, _ = batch_ABD(batch)
+    return np.asarray(objective(ABD, compliance, batch), dtype=float)
@@ -0,0 +1,58 @@
+from collections import namedtuple
+
+import numpy as np
+
+from abd import assemble_ABD
+
+# tapered panels made of zones that drop plies from a master laminate
+
+
+PanelResult = namedtuple('PanelResult', 'A, B, D, ABD, blending')
+
+
+class Panel:
+    '''Tapered panel: a master ply list and the plies present in each zone
+    Zones are ordered along the taper. Each zone's plies keep the master
+    order and stack without gaps about the zone's own mid-plane.'''
+
+    def __init__(self, laminate, presence):
+        '''Makes a panel from master `laminate` (an `abd.Laminate`)
+        `presence` is a (Z,N) bool mask, True where zone z has ply n'''
+        presence = np.asarray(presence, dtype=bool)
+        if presence.ndim != 2 or presence.shape[1] != len(laminate):
+            raise ValueError('presence must be (zones, plies of the master laminate)')
+        if not presence.any(axis=1).all():
+            raise ValueError('every zone needs at least one ply')
+        self.laminate = laminate
+        self.presence = presence
+
+
+    def __len__(self):
+        return len(self.presence)
+
+
+    def evaluate(self):
+        '''A, B, D of every zone and the blending check in one pass
+        The rotated Q of each master ply is shared by all zones.
+        `blending` is True where a ply is dropped in a zone but present
+        in zones on both sides of it, so it reappears after being dropped.
+        returns: PanelResult of (Z,3,3) A, B, D, (Z,6,6) ABD, (Z,N) blending'''
+        presence = self.presence
+
+        # dropped plies have no thickness in that zone
+        thickness = presence * self.laminate.thickness
+        z_upper = np.cumsum(thickness, axis=1)
+        z_upper = z_upper - z_upper[:,-1:] / 2
+        z_lower = z_upper - thickness
+
+        # (z_upper^k - z_lower^k) / k for every zone and ply
+        k = np.arange(1, 4)[:,np.newaxis,np.newaxis]
+        dz = (z_upper**k - z_lower**k) / k
+        A, B, D = np.einsum('kzn,nij->kzij', dz, self.laminate.Q)
+
+        # a ply missing between two zones that have it
+        before = np.maximum.accumulate(presence, axis=0)
+        after = np.maximum.accumulate(presence[::-1], axis=0)[::-1]
+        blending = ~presence & before & after
+
+        return PanelResult(A, B, D, assemble_ABD(A, B, D), blending)
@@ -0,0 +1,184 @@
+from collections import namedtuple
+
+import numpy as np
+
+from stiffness import (
+    T_batch,
+    T_strain_batch
+)
+from abd import invert_ABD
+from recovery import (
+    ply_z_points,
+    ply_apply
+)
+from failure import (
+    ply_allowables,
+    strength_ratio,
+    FIBER_TENSION,
+    FIBER_COMPRESSION
+)
+
+# progressive ply failure, first ply to last ply
+#
+# Every load case is ramped along its own direction. Each step finds the
+# load factor at which the next ply fails in the degraded laminate, then
+# degrades that ply. A ply that fails below the load already reached
+# fails at that load (a cascade). Degrading a ply changes ABD by that
+# ply's contribution alone, so each step updates ABD by a delta.
+#
+# Failed plies keep a residual stiffness, so ABD never becomes singular.
+# A case has collapsed, and its last ply failure is the load reached,
+# once its stiffness along the load, 1 / (F . compliance . F), drops
+# below `collapse` times the intact value.
+#
+# Degradation rules, applied in material axes:
+# ply_discount  every failure scales the whole ply Q by `residual`
+# mode          fiber failures do the same; matrix and shear failures
+#               scale only Q12, Q22 and Q66, and the ply can still
+#               fail later in a fiber mode
+
+RULES = ('ply_discount', 'mode')
+
+INTACT, MATRIX_FAILED, FAILED = range(3)
+
+ProgressiveResult = namedtuple(
+    'ProgressiveResult', 'first_ply, last_ply, load_factor, ply, mode, steps')
+
+
+def progressive_failure(laminate, loads, criterion='tsai_wu', rule='ply_discount',
+                        residual=1e-6, points=3, max_steps=None, collapse=1e-3):
+    '''Ramps `loads` ((6,) or (L,6) load cases) on `laminate` to last ply failure
+    `criterion` is one of `failure.CRITERIA`, `rule` one of RULES.
+    Failed terms keep `residual` times their stiffness so ABD stays invertible.
+    A case stops when its stiffness along the load falls below `collapse`
+    times the intact stiffness, or when every ply has failed.
+    returns: ProgressiveResult of first and last ply failure load factors (L,),
+    and for each step the load factor, failed ply and mode (L,S), padded with
+    nan / -1 after each case's `steps` (L,)'''
+    if rule not in RULES:
+        raise ValueError(f'unknown degradation rule: {rule}')
+    loads = np.atleast_2d(np.asarray(loads, dtype=float))
+    L = len(loads)
+    N = len(laminate)
+    if max_steps is None:
+        max_steps = 2 * N if rule == 'mode' else N
+
+    # material axis stiffness of each ply, and transforms to laminate axes
+    t = np.radians(laminate.orientation)
+    T_strain = T_strain_batch(t)
+    T_inv = np.linalg.inv(T_batch(t))
+    Q_material = np.array([mat.Q for mat in laminate.materials])[laminate.material]
+    Q = np.repeat(Q_material[np.newaxis], L, axis=0)
+
+    # each ply's z moments about the mid-plane
+    k = np.arange(1, 4)[:,np.newaxis]
+    dz = ((laminate.z_upper**k - laminate.z_lower**k) / k).T
+    z = ply_z_points(laminate.z_lower, laminate.z_upper, points)
+    allowables = ply_allowables(laminate)[:,np.newaxis]
+
+    A, B, D, _ = laminate.ABD()
+    ABD = np.repeat(np.stack((A, B, D))[np.newaxis], L, axis=0)
+    state = np.zeros((L, N), dtype=int)
+    factor = np.zeros(L)
+    active = np.ones(L, dtype=bool)
+
+    load_factor = np.full((L, max_steps), np.nan)
+    failed_ply = np.full((L, max_steps), -1)
+    failed_mode = np.full((L, max_steps), -1)
+    steps = np.zeros(L, dtype=int)
+
+    for step in range(max_steps):
+        cases = np.flatnonzero(active)
+        if len(cases) == 0:
+            break
+
+        # compliance along each load, and cases that can no longer carry it
+        compliance, _ = invert_ABD(ABD[cases,0], ABD[cases,1], ABD[cases,2])
+        energy = np.einsum('ci,cij,cj->c', loads[cases], compliance, loads[cases])
+        if step == 0:
+            intact = energy
+        collapsed = energy * collapse > intact[cases]
+        active[cases[collapsed]] = False
+        cases = cases[~collapsed]
+        compliance = compliance[~collapsed]
+        if len(cases) == 0:
+            break
+
+        # material axis strains and stresses at the reference loads
+        strains = (compliance @ loads[cases][:,:,np.newaxis])[:,:,0]
+        strain = ply_apply(T_strain, strains[:,:3], strains[:,3:], z)
+        stress = strain @ Q[cases].swapaxes(-1, -2)
+        ratio, mode = strength_ratio(stress, strain, allowables, criterion)
+
+        # plies with matrix failure can only fail in the fiber now
+        ply_state = state[cases][:,:,np.newaxis]
+        s1 = stress[...,0]
+        with np.errstate(divide='ignore'):
+            fiber = np.where(s1 >= 0, allowables[...,0], allowables[...,1]) / np.abs(s1)
+        matrix_failed = ply_state == MATRIX_FAILED
+        ratio = np.where(matrix_failed, fiber, ratio)
+        mode = np.where(matrix_failed, np.where(s1 >= 0, FIBER_TENSION, FIBER_COMPRESSION), mode)
+        ratio = np.where(ply_state == FAILED, np.inf, ratio)
+
+        # next ply to fail in each case
+        n_cases = len(cases)
+        flat = ratio.reshape(n_cases, -1).argmin(axis=1)
+        ply, point = np.unravel_index(flat, ratio.shape[1:])
+        within = np.arange(n_cases)
+        r = ratio[within, ply, point]
+        m = mode[within, ply, point]
+
+        done = ~np.isfinite(r)
+        active[cases[done]] = False
+        keep = ~done
+        cases, ply, m, r = cases[keep], ply[keep], m[keep], r[keep]
+
+        factor[cases] = np.maximum(factor[cases], r)
+        load_factor[cases, step] = factor[cases]
+        failed_ply[cases, step] = ply
+        failed_mode[cases, step] = m
+        steps[cases] = step + 1
+
+        # degrade the failed plies
+        whole = (rule == 'ply_discount') | (m == FIBER_TENSION) | (m == FIBER_COMPRESSION)
+        old = Q[cases, ply]
+        new = old.copy()
+        new[whole] = Q_material[ply[whole]] * residual
+        for i, j in ((0, 1), (1, 0), (1, 1), (2, 2)):
+            new[~whole, i, j] = Q_material[ply[~whole], i, j] * residual
+        Q[cases, ply] = new
+        state[cases, ply] = np.where(whole, FAILED, MATRIX_FAILED)
+
+        # ABD changes by the failed ply's contribution only
+        delta = T_inv[ply] @ (new - old) @ T_strain[ply]
+        ABD[cases] += dz[ply][:,:,np.newaxis,np.newaxis] * delta[:,np.newaxis]
+
+        active[cases[(state[cases] == FAILED).all(axis=1)]] = False
+
+    first = load_factor[:,0]
+    last = factor.copy()
+    last[steps == 0] = np.nan
+    return ProgressiveResult(first, last, load_factor, failed_ply, failed_mode, steps)
+
+
+if __name__ == '__main__':
+    from materials import Material, read_strength
+    from abd import Laminate
+
+    # [0/45/-45/90]s under Nx collapses when its 0 degree plies break,
+    # even though the failed plies keep a residual stiffness
+    strength = read_strength({'Xt': 1500, 'Xc': 1200, 'Yt': 50, 'Yc': 250, 'S': 70}, 150e3, 10e3, 5e3)
+    mat = Material('carbon', 150e3, 10e3, 5e3, 0.3, strength=strength)
+    laminate = Laminate.from_plies([0, 45, -45, 90, 90, -45, 45, 0], 0.125, mat)
+
+    for rule in RULES:
+        result = progressive_failure(laminate, [1, 0, 0, 0, 0, 0], rule=rule)
+        steps = result.steps[0]
+        fiber = np.flatnonzero(
+            (laminate.orientation[result.ply[0,:steps]] == 0)
+            & (result.mode[0,:steps] == FIBER_TENSION))
+        assert len(fiber) > 0, f'{rule}: no 0 degree fiber failure'
+        collapse_factor = result.load_factor[0,fiber[0]]
+        assert np.isclose(result.last_ply[0], collapse_factor), \
+            f'{rule}: last ply {result.last_ply[0]} after collapse at {collapse_factor}'
+        print(f'{rule}: first ply {result.first_ply[0]:.4g}, last ply {result.last_ply[0]:.4g}, {steps} steps')
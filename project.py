@@ -1,21 +1,20 @@
 import numpy as np
 
-from abd import calculate_ABD, get_layers
+from abd import Laminate
+from solver import LaminateSolver
+from recovery import recover
 
-A,B,D, layers = calculate_ABD(
-    lam_file='BladeLaminateCored.csv', 
-    lam_dir='designlib/project/', 
+laminate = Laminate.from_file(
+    'designlib/project/BladeLaminateCored.csv',
     mat_dir='designlib/project/'
 )
+A,B,D, _ = laminate.ABD()
+layers = laminate.layers
 
 # print('A = \n{}\n'.format(A))
 # print('B = \n{}\n'.format(B))
 # print('D = \n{}'.format(D))
 
-AB = np.append(A,B,axis=1)
-BD = np.append(B,D,axis=1)
-ABD = np.append(AB,BD,axis=0)
-
 # applied load
 applied_loads = np.array([
     0,
@@ -27,7 +26,8 @@ applied_loads = np.array([
 ]).T
 
 # compute strains from loads, matrix multiplication
-strains = np.linalg.inv(ABD) @ applied_loads
+solver = LaminateSolver(A, B, D)
+strains = solver.strains(applied_loads)
 e = strains[:3]
 K = strains[3:]
 print()
@@ -38,10 +38,11 @@ print(strains)
 tensile_strength = 610e3 # psi
 compressive_strength = -8.7e3 # psi
 
-# compute stress in each layer and MS
+# stress at the lower surface of each layer, then MS
+stress = recover(laminate, strains).stress[0,:,0]
 print('\nstresses:')
-for layer in layers:
-    layer.stress = layer.Q @ e +  layer.Q @ K * layer.z_lower
+for layer, layer_stress in zip(layers, stress):
+    layer.stress = layer_stress
     if layer.stress[0] < 0:
         layer.MS = compressive_strength / layer.stress[0] - 1
     elif layer.stress[0] > 0:
@@ -1,8 +1,8 @@
 import numpy as np
 
-from abd import calculate_ABD
+from abd import calculate_ABD, assemble_ABD
 
-A,B,D = calculate_ABD(
+A,B,D, layers = calculate_ABD(
     lam_file='Shaft1.csv', 
     lam_dir='designlib/project/', 
     mat_dir='designlib/project/'
@@ -12,9 +12,7 @@ print('A = \n{}\n'.format(A))
 print('B = \n{}\n'.format(B))
 print('D = \n{}'.format(D))
 
-AB = np.append(A,B,axis=1)
-BD = np.append(B,D,axis=1)
-ABD = np.append(AB,BD,axis=0)
+ABD = assemble_ABD(A, B, D)
 
 applied = np.array([
     100,
@@ -0,0 +1,80 @@
+from collections import namedtuple
+
+import numpy as np
+
+from stiffness import (
+    T_batch,
+    T_strain_batch
+)
+from solver import LaminateSolver
+
+# ply stresses and strains for many load cases at once
+#
+# Arrays are (L,N,P,3): load case, ply (bottom up), z point through the
+# ply (bottom to top), then [x, y, xy] or [1, 2, 12] components.
+# Shear strains are engineering strains.
+
+
+Recovery = namedtuple('Recovery', 'z, strain, stress')
+
+
+def ply_z_points(z_lower, z_upper, points=3):
+    '''`points` evenly spaced z through each ply, bottom to top
+    3 points gives the bottom, middle and top of each ply
+    returns: (N,points) array'''
+    z_lower = np.asarray(z_lower, dtype=float)[:,np.newaxis]
+    z_upper = np.asarray(z_upper, dtype=float)[:,np.newaxis]
+    if points == 1:
+        return (z_lower + z_upper) / 2
+    f = np.linspace(0, 1, points)
+    return z_lower + f * (z_upper - z_lower)
+
+
+def recover(laminate, strains, points=3, axes='laminate'):
+    '''Ply strains and stresses of `laminate` (an `abd.Laminate`)
+    `strains` are midplane strains and curvatures, (6,) or (L,6)
+    `axes` is 'laminate' for x-y components or 'material' for 1-2
+    returns: Recovery of z (N,P), strain and stress (L,N,P,3)'''
+    strains = np.atleast_2d(np.asarray(strains, dtype=float))
+    e0 = strains[:,:3]
+    k = strains[:,3:]
+    z = ply_z_points(laminate.z_lower, laminate.z_upper, points)
+    Q = laminate.Q
+
+    if axes == 'laminate':
+        strain = ply_apply(None, e0, k, z)
+        stress = ply_apply(Q, e0, k, z)
+    elif axes == 'material':
+        t = np.radians(laminate.orientation)
+        strain = ply_apply(T_strain_batch(t), e0, k, z)
+        stress = ply_apply(T_batch(t) @ Q, e0, k, z)
+    else:
+        raise ValueError(f"axes must be 'laminate' or 'material', not {axes!r}")
+    return Recovery(z, strain, stress)
+
+
+def recover_loads(laminate, loads, points=3, axes='laminate', solver=None):
+    '''Ply strains and stresses of `laminate` under `loads`, (6,) or (L,6)
+    `solver` is a `solver.LaminateSolver` of the laminate, made if not given
+    returns: Recovery of z (N,P), strain and stress (L,N,P,3)'''
+    if solver is None:
+        solver = LaminateSolver.from_laminate(laminate)
+    return recover(laminate, solver.strains(loads), points, axes)
+
+
+def ply_apply(M, e0, k, z):
+    '''M_n (e0 + z k) for every load case, ply n and z point
+    `M` is (N,3,3), or None for the identity; `e0`, `k` are (L,3)
+    Both terms are one matrix multiply over all plies at once.
+    returns: (L,N,P,3) array'''
+    L = len(e0)
+    N = len(z)
+    if M is None:
+        a = np.broadcast_to(e0[:,np.newaxis,np.newaxis], (L, N, 1, 3))
+        b = np.broadcast_to(k[:,np.newaxis,np.newaxis], (L, N, 1, 3))
+    else:
+        # columns [n, i] of M_n[i, j], so e @ M gives each ply's M_n e
+        M = np.asarray(M).transpose(2, 0, 1).reshape(3, N * 3)
+        a = (e0 @ M).reshape(L, N, 1, 3)
+        b = (k @ M).reshape(L, N, 1, 3)
+    return a + z[np.newaxis,:,:,np.newaxis] * b
@@ -0,0 +1,79 @@
+import numpy as np
+
+from abd import (
+    assemble_ABD,
+    laminate_structure
+)
+
+# midplane strains from force/moment resultants for many load cases
+#
+# ABD is factored once per laminate. The compliance is kept, so each
+# batch of load cases is a single matrix multiply.
+
+
+class LaminateSolver:
+    '''Factored ABD of one laminate
+    Loads are [Nx, Ny, Nxy, Mx, My, Mxy] and strains are midplane
+    strains and curvatures [ex, ey, gxy, kx, ky, kxy], either one (6,)
+    vector or an (L,6) array of load cases.
+
+    Laminates with B = 0 factor A and D separately, coupled ones the
+    6x6 ABD. Solving is then one multiply by the kept compliance, which
+    for decoupled laminates has exact zero coupling blocks.'''
+
+    def __init__(self, A, B, D, tol=1e-8):
+        '''Factors the laminate with stiffness `A`, `B`, `D`
+        B counts as zero when within `tol` of the scale of A and D
+        (see `abd.laminate_structure`)'''
+        self.A = np.array(A, dtype=float)
+        self.B = np.array(B, dtype=float)
+        self.D = np.array(D, dtype=float)
+        self.ABD = assemble_ABD(self.A, self.B, self.D)
+        self.structure = laminate_structure(self.A, self.B, self.D, tol)
+        self.decoupled = bool(self.structure.symmetric)
+
+        # Cholesky factors L L^T, and the compliance L^-T L^-1 from them
+        if self.decoupled:
+            self.L = (cholesky(self.A), cholesky(self.D))
+            self.compliance = np.zeros((6, 6))
+            self.compliance[:3,:3] = inverse_from_cholesky(self.L[0])
+            self.compliance[3:,3:] = inverse_from_cholesky(self.L[1])
+        else:
+            self.L = cholesky(self.ABD)
+            self.compliance = inverse_from_cholesky(self.L)
+
+
+    @classmethod
+    def from_laminate(cls, laminate, tol=1e-8):
+        '''Factors `laminate` (an `abd.Laminate`)'''
+        A, B, D, _ = laminate.ABD()
+        return cls(A, B, D, tol)
+
+
+    def strains(self, loads):
+        '''Midplane strains and curvatures under `loads`
+        returns: array the shape of `loads`'''
+        loads = np.asarray(loads, dtype=float)
+        return loads @ self.compliance.T
+
+
+    def loads(self, strains):
+        '''Force and moment resultants that give `strains`
+        returns: array the shape of `strains`'''
+        strains = np.asarray(strains, dtype=float)
+        return strains @ self.ABD.T
+
+
+def cholesky(M):
+    '''Lower triangular L with M = L L^T
+    Raises ValueError if `M` is not positive definite'''
+    try:
+        return np.linalg.cholesky(M)
+    except np.linalg.LinAlgError:
+        raise ValueError('stiffness matrix is not positive definite') from None
+
+
+def inverse_from_cholesky(L):
+    '''Inverse of L L^T from its Cholesky factor'''
+    L_inv = np.linalg.inv(L)
+    return L_inv.T @ L_inv
@@ -13,47 +13,200 @@ def T(t):
     return np.array(
         [[np.cos(t)**2,         np.sin(t)**2,           2*np.sin(t)*np.cos(t)],
         [np.sin(t)**2,          np.cos(t)**2,           -2*np.sin(t)*np.cos(t)],
-        [-np.sin(t)*np.cos(t),  np.sin(t)*np.cos(t),    np.cos(t)**2 * np.sin(t)**2]]
+        [-np.sin(t)*np.cos(t),  np.sin(t)*np.cos(t),    np.cos(t)**2 - np.sin(t)**2]]
     )
 
 
+def T_batch(t):
+    '''Stress transformation matrices at each of angles `t` (radians)
+    returns: array of shape t.shape + (3,3), T(t) for each angle'''
+    t = np.asarray(t, dtype=float)
+    c = np.cos(t)
+    s = np.sin(t)
+    T = np.empty(t.shape + (3,3))
+    T[...,0,0] = c*c
+    T[...,0,1] = s*s
+    T[...,0,2] = 2*s*c
+    T[...,1,0] = s*s
+    T[...,1,1] = c*c
+    T[...,1,2] = -2*s*c
+    T[...,2,0] = -s*c
+    T[...,2,1] = s*c
+    T[...,2,2] = c*c - s*s
+    return T
+
+
+def T_strain_batch(t):
+    '''Engineering strain transformation matrices at angles `t` (radians)
+    Usage:
+    [e1, e2, g12] = [T_strain][ex, ey, gxy]
+    returns: array of shape t.shape + (3,3)'''
+    T = T_batch(t)
+    T[...,0:2,2] /= 2
+    T[...,2,0:2] *= 2
+    return T
+
+
 def make_Q(E1, E2, G12, v12):
-    '''makes a Q matrix from lamina level properties'''
+    '''makes a Q matrix from lamina level properties
+    Properties may be arrays of broadcastable shapes,
+    which gives a (...,3,3) stack of Q matrices'''
+    E1, E2, G12, v12 = np.broadcast_arrays(
+        *(np.asarray(p, dtype=float) for p in (E1, E2, G12, v12)))
     v21 = E2 / E1 * v12
     Q11 = E1 / (1 - v12 * v21)
     Q22 = E2 / (1 - v12 * v21)
     Q12 = v12 * Q22
     Q66 = G12
-    return np.array(
-        [[Q11, Q12, 0],
-        [Q12, Q22, 0],
-        [0, 0, Q66]]
-    )
 
+    Q = np.zeros(E1.shape + (3,3))
+    Q[...,0,0] = Q11
+    Q[...,0,1] = Q12
+    Q[...,1,0] = Q12
+    Q[...,1,1] = Q22
+    Q[...,2,2] = Q66
+    return Q
+
+
+def make_Q_grid(E1, E2, G12, v12):
+    '''Q matrices over the full grid of lamina property values
+    Each argument is a 1-D array of candidate values
+    returns: (len(E1),len(E2),len(G12),len(v12),3,3) array'''
+    return make_Q(*np.ix_(
+        np.ravel(E1), np.ravel(E2), np.ravel(G12), np.ravel(v12)))
+
+
+def invariants(Q):
+    '''Tsai-Pagano invariants of the Q matrix (or (...,3,3) stack) `Q`
+    returns: array of U1, U2, U3, U4, U5 along the last axis'''
+    Q = np.asarray(Q, dtype=float)
+    Q11 = Q[...,0,0]
+    Q12 = Q[...,0,1]
+    Q22 = Q[...,1,1]
+    Q66 = Q[...,2,2]
+
+    U = np.empty(Q.shape[:-2] + (5,))
+    U[...,0] = (3*Q11 + 3*Q22 + 2*Q12 + 4*Q66) / 8
+    U[...,1] = (Q11 - Q22) / 2
+    U[...,2] = (Q11 + Q22 - 2*Q12 - 4*Q66) / 8
+    U[...,3] = (Q11 + Q22 + 6*Q12 - 4*Q66) / 8
+    U[...,4] = (Q11 + Q22 - 2*Q12 + 4*Q66) / 8
+    return U
+
+
+def rotate_invariants(U, t, dtype=np.float64):
+    '''Rotated Q matrices from a (N,5) stack of invariants `U`
+    `t` is an array of angles in radians, broadcast against (N,1)
+    `dtype` sets the precision, e.g. np.float32 for large sweeps
+    returns: (N,M,3,3) array of rotated Q matrices'''
+    U = np.asarray(U, dtype=dtype)
+    if U.ndim == 1:
+        U = U[np.newaxis]
+    t = np.asarray(t, dtype=dtype)
+
+    # invariants as columns so they broadcast along the angles
+    U1, U2, U3, U4, U5 = (U[:,i,np.newaxis] for i in range(5))
+
+    c2 = np.cos(2*t)
+    s2 = np.sin(2*t)
+    c4 = np.cos(4*t)
+    s4 = np.sin(4*t)
+
+    shape = np.broadcast(U1, t).shape
+    Q_rot = np.empty(shape + (3,3), dtype=dtype)
+    Q_rot[...,0,0] = U1 + U2*c2 + U3*c4
+    Q_rot[...,1,1] = U1 - U2*c2 + U3*c4
+    Q_rot[...,0,1] = U4 - U3*c4
+    Q_rot[...,2,2] = U5 - U3*c4
+    Q_rot[...,0,2] = U2/2*s2 + U3*s4
+    Q_rot[...,1,2] = U2/2*s2 - U3*s4
+    Q_rot[...,1,0] = Q_rot[...,0,1]
+    Q_rot[...,2,0] = Q_rot[...,0,2]
+    Q_rot[...,2,1] = Q_rot[...,1,2]
+    return Q_rot
 
 
 def rotate_Q(Q, t):
     '''Returns matrix Q, rotated by angle `t`'''
-    m = np.cos(t)
-    n = np.sin(t)
+    return rotate_invariants(invariants(Q), t)[0,0]
 
-    Q11 = Q[0,0]
-    Q12 = Q[0,1]
-    Q22 = Q[1,1]
-    Q66 = Q[2,2]
 
-    Q11_rot = Q11 * m**4 + Q22 * n**4 + 2 * (Q12 + 2 * Q66) * m**2 * n**2
-    Q12_rot = (Q11 + Q22 - 4*Q66) * m**2 * n**2 + Q12 * (m**4 + n**4)
-    Q22_rot = Q11 * n**4 + Q22 * m**4 + 2 * (Q12 + 2*Q66) * m**2 * n**2
-    Q16_rot = (Q11 - Q12 - 2*Q66) * m**3 * n + (Q12 - Q22 + 2*Q66) * m * n**3
-    Q26_rot = (Q11 - Q12 - 2*Q66) * m * n**3 + (Q12 - Q22 + 2*Q66) * m**3 * n
-    Q66_rot = (Q11 + Q22 - 2*Q12 - 2*Q66) * m**2 * n**2 + Q66 * (m**4 + n**4)
+def rotate_Q_batch(Q, t, dtype=np.float64):
+    '''Rotates a stack of Q matrices by an array of angles in one pass
+    `Q` is a (N,3,3) stack (a single (3,3) matrix is treated as N=1)
+    `t` is an array of angles in radians, broadcast against (N,1)
+    A 1-D `t` of length M gives every Q at every angle
+    `dtype` sets the precision, e.g. np.float32 for large sweeps
+    returns: (N,M,3,3) array of rotated Q matrices'''
+    return rotate_invariants(invariants(Q), t, dtype)
 
-    return np.array(
-        [[Q11_rot, Q12_rot, Q16_rot],
-        [Q12_rot, Q22_rot, Q26_rot],
-        [Q16_rot, Q26_rot, Q66_rot]]
-    )
+
+def clamp_Q(Q, tol=1e-5):
+    '''Returns a copy of `Q` with values close to zero set to zero'''
+    Q = np.array(Q, dtype=float)
+    Q[np.abs(Q) <= tol] = 0
+    return Q
+
+
+class RotationTable:
+    '''Rotated Q matrices of one material, precomputed at fixed angles
+    The table holds every whole degree plus any custom `angles` (degrees).
+    Angles in the table are an array lookup, others are rotated exactly.'''
+
+    def __init__(self, Q, angles=(), tol=1e-5):
+        '''Builds the table for nominal matrix `Q`
+        Values with magnitude <= `tol` are clamped to zero'''
+        self.Q_nominal = np.array(Q, dtype=float)
+        self.U = invariants(self.Q_nominal)
+        self.tol = tol
+
+        # Q repeats every 180 degrees, so only store one period
+        angles = np.append(np.arange(180), np.asarray(angles, dtype=float))
+        self.angles = np.unique(angles % 180)
+        self.Q = self.rotate(self.angles)
+
+
+    def rotate(self, angles):
+        '''Exact rotation of the nominal Q to `angles` (degrees), clamped'''
+        t = np.asarray(angles, dtype=float) * np.pi / 180
+        return clamp_Q(rotate_invariants(self.U, t)[0], self.tol)
+
+
+    def lookup(self, angles):
+        '''Rotated Q for each of `angles` (degrees)
+        returns: array of shape angles.shape + (3,3)'''
+        angles = np.asarray(angles, dtype=float)
+        flat = angles.ravel()
+        wrapped = flat % 180
+
+        # find the angles that are in the table
+        idx = np.searchsorted(self.angles, wrapped)
+        idx[idx == len(self.angles)] = 0
+        found = self.angles[idx] == wrapped
+
+        Q = np.empty(flat.shape + (3,3))
+        Q[found] = self.Q[idx[found]]
+        if not found.all():
+            Q[~found] = self.rotate(flat[~found])
+        return Q.reshape(angles.shape + (3,3))
+
+
+    def save(self, fp):
+        '''Saves the table to the .npz file `fp`'''
+        np.savez(fp, Q_nominal=self.Q_nominal, angles=self.angles, Q=self.Q, tol=self.tol)
+
+
+    @classmethod
+    def load(cls, fp):
+        '''Loads a table saved with `save` from `fp`'''
+        data = np.load(fp)
+        table = cls.__new__(cls)
+        table.Q_nominal = data['Q_nominal']
+        table.U = invariants(table.Q_nominal)
+        table.angles = data['angles']
+        table.Q = data['Q']
+        table.tol = float(data['tol'])
+        return table
 
 
 def Q2props(Q):
@@ -73,6 +226,45 @@ def Q2props(Q):
     return E1, E2, v12, v21, G12
 
 
+def Q2props_batch(Q):
+    '''Effective properties of a (...,3,3) stack of Q matrices
+    Properties come from the compliance S = inv(Q), so they hold for
+    rotated Q: E1 = 1/S11, E2 = 1/S22, G12 = 1/S66, v12 = -S12/S11.
+    This differs from `Q2props`, which is only right for unrotated Q.
+    Also gives the coefficients of mutual influence,
+    eta_xy_x = S16/S11, eta_xy_y = S26/S22, eta_x_xy = S16/S66, eta_y_xy = S26/S66
+    returns: dict of (...) arrays keyed by property name'''
+    Q = np.asarray(Q, dtype=float)
+
+    Q11 = Q[...,0,0]
+    Q12 = Q[...,0,1]
+    Q22 = Q[...,1,1]
+    Q66 = Q[...,2,2]
+    Q16 = Q[...,0,2]
+    Q26 = Q[...,1,2]
+
+    # cofactors of the symmetric Q, S = cofactor / det
+    S11 = Q22*Q66 - Q26**2
+    S22 = Q11*Q66 - Q16**2
+    S66 = Q11*Q22 - Q12**2
+    S12 = Q16*Q26 - Q12*Q66
+    S16 = Q12*Q26 - Q22*Q16
+    S26 = Q12*Q16 - Q11*Q26
+    det = Q11*S11 + Q12*S12 + Q16*S16
+
+    props = {}
+    props['E1'] = det / S11
+    props['E2'] = det / S22
+    props['G12'] = det / S66
+    props['v12'] = -S12 / S11
+    props['v21'] = -S12 / S22
+    props['eta_xy_x'] = S16 / S11
+    props['eta_xy_y'] = S26 / S22
+    props['eta_x_xy'] = S16 / S66
+    props['eta_y_xy'] = S26 / S66
+    return props
+
+
 if __name__ == '__main__':
     Q = np.array(
         [[150, 5, 0],
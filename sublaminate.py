@@ -0,0 +1,99 @@
+import numpy as np
+
+from abd import assemble_ABD
+from incremental import ply_moments
+
+# ABD of contiguous ply ranges of one laminate
+
+
+class SubLaminateIndex:
+    '''Prefix sums of a laminate's ply moments
+    The A, B, D of any contiguous range of plies [i, j),
+    about any reference plane, take a few array operations.
+
+    Differences of prefix sums about one far away plane cancel badly for
+    thin ranges, so plies are grouped in blocks: sums inside a block are
+    about its bottom face, and only whole blocks use sums about z = 0.
+    The relative error of D is then about eps * 4 block^3 for ranges in
+    one or two blocks, and eps * (N / block)^3 / 2 for longer ones. The
+    default block of sqrt(N/2) plies balances them, about eps * N^1.5,
+    e.g. 1e-10 at 3000 plies of equal thickness.'''
+
+    def __init__(self, laminate, block=None):
+        '''Indexes `laminate` (an `abd.Laminate`)
+        `block` is the number of plies per block, sqrt(N/2) by default'''
+        self.z = np.append(laminate.z_lower, laminate.z_upper[-1:])
+        N = len(laminate)
+        if block is None:
+            block = max(1, int(round(np.sqrt(N / 2))))
+        self.block = block
+        blocks = -(-N // block)
+
+        # bottom face of each block, and one past the top
+        self.origin = self.z[np.minimum(np.arange(blocks + 1) * block, N)]
+
+        # moments of each ply about its block's bottom face,
+        # padded with empty plies to whole blocks
+        owner = np.arange(N) // block
+        moments = np.zeros((blocks * block, 3, 3, 3))
+        moments[:N] = ply_moments(
+            laminate.Q,
+            laminate.z_lower - self.origin[owner],
+            laminate.z_upper - self.origin[owner])
+        moments = moments.reshape(blocks, block, 3, 3, 3)
+        self.local = np.concatenate(
+            (np.zeros((blocks, 1, 3, 3, 3)), np.cumsum(moments, axis=1)), axis=1)
+
+        # whole blocks about z = 0
+        totals = shift(self.local[:,-1], self.origin[:-1,np.newaxis,np.newaxis])
+        self.prefix = np.concatenate(
+            (np.zeros((1, 3, 3, 3)), np.cumsum(totals, axis=0)))
+
+
+    def __len__(self):
+        return len(self.z) - 1
+
+
+    def ABD(self, i, j, z_ref=None):
+        '''A, B, D of plies [i, j) about the plane `z_ref`
+        `i`, `j` and `z_ref` may be arrays, giving (...,3,3) results
+        `z_ref` defaults to the mid-plane of each sub-laminate
+        returns: A, B, D, ABD'''
+        i = np.asarray(i)
+        j = np.asarray(j)
+        if np.any(i < 0) or np.any(j > len(self)) or np.any(i >= j):
+            raise ValueError('ply ranges must satisfy 0 <= i < j <= len')
+        if z_ref is None:
+            z_ref = (self.z[i] + self.z[j]) / 2
+        i, j, z0 = np.broadcast_arrays(i, j, np.asarray(z_ref, dtype=float))
+        z0 = z0[...,np.newaxis,np.newaxis]
+
+        # first and last block of each range, and the ply offsets in them
+        first, start = np.divmod(i, self.block)
+        last = (j - 1) // self.block
+        stop = j - last * self.block
+        same = (first == last)[...,np.newaxis,np.newaxis,np.newaxis]
+
+        # head of the first block, up to `stop` if the range ends in it
+        head_stop = np.where(first == last, stop, self.block)
+        head = self.local[first, head_stop] - self.local[first, start]
+        moments = shift(head, self.origin[first][...,np.newaxis,np.newaxis] - z0)
+
+        # tail of the last block and the whole blocks between
+        tail = shift(self.local[last, stop], self.origin[last][...,np.newaxis,np.newaxis] - z0)
+        middle = shift(self.prefix[last] - self.prefix[np.minimum(first + 1, last)], -z0)
+        moments = moments + np.where(same, 0, tail + middle)
+
+        A, B, D = np.moveaxis(moments, -3, 0)
+        return A, B, D, assemble_ABD(A, B, D)
+
+
+def shift(moments, d):
+    '''Moments about a plane moved to a plane `d` below it
+    `moments` are (...,3,3,3) as from `incremental.ply_moments`,
+    `d` broadcasts against (...,1,1)'''
+    d = np.asarray(d, dtype=float)
+    m0 = moments[...,0,:,:]
+    m1 = moments[...,1,:,:] + d * m0
+    m2 = moments[...,2,:,:] + 2 * d * moments[...,1,:,:] + d * d * m0
+    return np.stack((m0, m1, m2), axis=-3)
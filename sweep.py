@@ -0,0 +1,275 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import wraps
+
+import numpy as np
+
+from abd import (
+    assemble_ABD,
+    invert_ABD
+)
+
+# exhaustive stacking-sequence enumeration and screening
+#
+# Candidates of each ply count are numbered 0 .. n_angles**genes - 1 and
+# decoded in chunks, so memory stays bounded however many there are.
+# Symmetric laminates only enumerate their lower half (and middle ply).
+
+
+SweepResult = namedtuple('SweepResult', 'sequences, scores')
+
+
+class SweepSettings:
+    '''Everything a worker needs to evaluate a chunk of candidates'''
+
+    def __init__(self, angles, Q, thickness, symmetric, balanced, objective, k, pareto):
+        self.angles = angles
+        self.Q = Q
+        self.thickness = thickness
+        self.symmetric = symmetric
+        self.balanced = balanced
+        self.objective = objective
+        self.k = k
+        self.pareto = pareto
+
+
+def sweep(angles, ply_counts, objective, material, thickness,
+          symmetric=False, balanced=False, k=10, pareto=False,
+          chunk=65536, processes=1):
+    '''Enumerates and screens every stacking sequence
+    `angles`      allowed ply angles (degrees)
+    `ply_counts`  ply counts to enumerate, e.g. range(8, 25, 2)
+    `objective`   called with each chunk of `Candidates`,
+                  returns (C,) scores, or (C,m) scores when `pareto`;
+                  lower is better. Must be picklable if `processes` > 1.
+    `symmetric`   only mirror-symmetric sequences
+    `balanced`    as many -t plies as +t plies, for every angle +-t in `angles`
+    Returns the `k` best sequences, or the Pareto set when `pareto`.
+    `chunk` candidates are evaluated at a time, on `processes` processes.
+    returns: SweepResult of sequences (tuples of angles, bottom up) and scores'''
+    angles = np.asarray(angles, dtype=float)
+    Q = material.rotate(angles)
+    settings = SweepSettings(angles, Q, float(thickness), symmetric, balanced, objective, k, pareto)
+
+    tasks = []
+    for n in ply_counts:
+        total = len(angles) ** gene_count(n, symmetric)
+        for start in range(0, total, chunk):
+            tasks.append((settings, n, start, min(start + chunk, total)))
+
+    if processes is None or processes > 1:
+        with ProcessPoolExecutor(processes) as pool:
+            parts = list(pool.map(_run_task, tasks))
+    else:
+        parts = [_run_task(task) for task in tasks]
+
+    sequences = [seq for part in parts for seq in part.sequences]
+    if not sequences:
+        return SweepResult([], np.empty(0))
+    scores = np.concatenate([part.scores for part in parts])
+    return select(sequences, scores, k, pareto)
+
+
+def gene_count(n, symmetric):
+    '''Number of freely chosen plies in a sequence of `n` plies'''
+    return (n + 1) // 2 if symmetric else n
+
+
+def ply_map(n, symmetric):
+    '''Gene of each ply of a sequence of `n` plies, bottom up'''
+    genes = np.arange(gene_count(n, symmetric))
+    if symmetric:
+        return np.concatenate((genes, genes[:n // 2][::-1]))
+    return genes
+
+
+def decode(start, stop, n_angles, n_genes):
+    '''Angle indices of candidates `start` to `stop`
+    returns: (C, n_genes) int array'''
+    number = np.arange(start, stop, dtype=np.int64)[:,np.newaxis]
+    place = n_angles ** np.arange(n_genes, dtype=np.int64)
+    return (number // place) % n_angles
+
+
+def lazy(f):
+    '''Property computed on first use, then kept'''
+    name = f.__name__
+
+    @property
+    @wraps(f)
+    def get(self):
+        if name not in self._cache:
+            self._cache[name] = f(self)
+        return self._cache[name]
+    return get
+
+
+class Candidates:
+    '''One chunk of `n`-ply candidates, passed to the sweep objective
+    Stiffness is computed up front; everything else on first use.
+    Each attribute has one row per candidate:
+    angles (C,n), A, B, D (C,3,3), ABD, compliance (C,6,6),
+    h (thickness), Ex, Ey, Gxy, vxy (in-plane effective constants)'''
+
+    def __init__(self, settings, n, genes):
+        t = settings.thickness
+        mapping = ply_map(n, settings.symmetric)
+        self.genes = genes
+        self.mapping = mapping
+        self.settings = settings
+        self.h = n * t
+        self._cache = {}
+
+        # z moments of each ply, summed onto the gene it comes from
+        z = np.arange(n + 1) * t - self.h / 2
+        k = np.arange(1, 4)[:,np.newaxis]
+        dz = (z[1:]**k - z[:-1]**k) / k
+        weights = np.zeros((3, genes.shape[1]))
+        np.add.at(weights.T, mapping, dz.T)
+
+        # weights of each angle's Q in A, B, D
+        n_angles = len(settings.angles)
+        W = np.empty((len(genes), 3, n_angles))
+        for a in range(n_angles):
+            W[:,:,a] = (genes == a) @ weights.T
+
+        ABD3 = (W @ settings.Q.reshape(n_angles, 9)).reshape(-1, 3, 3, 3)
+        self.A = ABD3[:,0]
+        self.B = ABD3[:,1]
+        self.D = ABD3[:,2]
+
+
+    def __len__(self):
+        return len(self.genes)
+
+
+    @lazy
+    def angles(self):
+        return self.settings.angles[self.genes[:,self.mapping]]
+
+
+    @lazy
+    def ABD(self):
+        return assemble_ABD(self.A, self.B, self.D)
+
+
+    @lazy
+    def compliance(self):
+        compliance, _ = invert_ABD(self.A, self.B, self.D)
+        return compliance
+
+
+    @lazy
+    def membrane_compliance(self):
+        '''a11, a22, a66, a12 of the in-plane compliance'''
+        if not self.settings.symmetric:
+            a = self.compliance
+            return a[:,0,0], a[:,1,1], a[:,2,2], a[:,0,1]
+
+        # B = 0, so the in-plane compliance is inv(A), by cofactors
+        A = self.A
+        c11 = A[:,1,1] * A[:,2,2] - A[:,1,2] * A[:,1,2]
+        c22 = A[:,0,0] * A[:,2,2] - A[:,0,2] * A[:,0,2]
+        c66 = A[:,0,0] * A[:,1,1] - A[:,0,1] * A[:,0,1]
+        c12 = A[:,0,2] * A[:,1,2] - A[:,0,1] * A[:,2,2]
+        det = A[:,0,0] * c11 + A[:,0,1] * c12 + A[:,0,2] * (A[:,0,1] * A[:,1,2] - A[:,1,1] * A[:,0,2])
+        return c11 / det, c22 / det, c66 / det, c12 / det
+
+
+    @lazy
+    def Ex(self):
+        return 1 / (self.h * self.membrane_compliance[0])
+
+
+    @lazy
+    def Ey(self):
+        return 1 / (self.h * self.membrane_compliance[1])
+
+
+    @lazy
+    def Gxy(self):
+        return 1 / (self.h * self.membrane_compliance[2])
+
+
+    @lazy
+    def vxy(self):
+        a11, _, _, a12 = self.membrane_compliance
+        return -a12 / a11
+
+
+def balanced_mask(settings, n, genes):
+    '''True for candidates with as many -t as +t plies'''
+    mapping = ply_map(n, settings.symmetric)
+    multiplicity = np.bincount(mapping, minlength=genes.shape[1])
+    angles = settings.angles
+
+    keep = np.ones(len(genes), dtype=bool)
+    for a, angle in enumerate(angles):
+        if angle <= 0 or angle % 90 == 0:
+            continue
+        opposite = np.flatnonzero(angles == -angle)
+        if len(opposite) == 0:
+            continue
+        plus = (genes == a) @ multiplicity
+        minus = (genes == opposite[0]) @ multiplicity
+        keep &= plus == minus
+    return keep
+
+
+def _run_task(task):
+    '''Evaluates one chunk and keeps its best candidates'''
+    settings, n, start, stop = task
+    genes = decode(start, stop, len(settings.angles), gene_count(n, settings.symmetric))
+    if settings.balanced:
+        genes = genes[balanced_mask(settings, n, genes)]
+    if len(genes) == 0:
+        return SweepResult([], np.empty(0))
+
+    candidates = Candidates(settings, n, genes)
+    scores = np.asarray(settings.objective(candidates), dtype=float)
+    keep = best_indices(scores, settings.k, settings.pareto)
+    sequences = [tuple(seq) for seq in candidates.angles[keep].tolist()]
+    return SweepResult(sequences, scores[keep])
+
+
+def select(sequences, scores, k, pareto):
+    '''Best `k` (or the Pareto set) of `sequences`, best first'''
+    keep = best_indices(scores, k, pareto)
+    return SweepResult([sequences[i] for i in keep], scores[keep])
+
+
+def best_indices(scores, k, pareto):
+    '''Indices of the `k` lowest scores, or of the non-dominated rows'''
+    if pareto:
+        return pareto_front(scores)
+    if len(scores) > k:
+        top = np.argpartition(scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(scores[top], kind='stable')]
+
+
+def pareto_front(scores):
+    '''Indices of the rows of (C,m) `scores` no other row dominates
+    (lower is better), sorted by the first objective'''
+    scores = np.asarray(scores, dtype=float)
+    order = np.lexsort(scores.T[::-1])
+    ordered = scores[order]
+
+    # sorted this way, a row can only be dominated by rows before it
+    if scores.shape[1] == 2:
+        best_before = np.minimum.accumulate(ordered[:,1])
+        keep = np.empty(len(ordered), dtype=bool)
+        keep[0] = True
+        keep[1:] = ordered[1:,1] < best_before[:-1]
+        return order[keep]
+
+    front = []
+    for i, row in enumerate(ordered):
+        if front:
+            kept = ordered[front]
+            dominated = np.all(kept <= row, axis=1) & np.any(kept < row, axis=1)
+            if dominated.any():
+                continue
+        front.append(i)
+    return order[front]
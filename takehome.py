@@ -1,6 +1,6 @@
 import numpy as np
 
-from abd import calculate_ABD, get_layers
+from abd import calculate_ABD, get_layers, assemble_ABD
 
 A,B,D, layers = calculate_ABD(
     lam_file='takehome.csv', 
@@ -12,10 +12,6 @@ A,B,D, layers = calculate_ABD(
 # print('B = \n{}\n'.format(B))
 # print('D = \n{}'.format(D))
 
-AB = np.append(A,B,axis=1)
-BD = np.append(B,D,axis=1)
-ABD = np.append(AB,BD,axis=0)
-
 # applied strain
 strains = np.array([
     0,
@@ -27,7 +23,7 @@ strains = np.array([
 ]).T
 
 # compute strains from loads, matrix multiplication
-loads = ABD @ strains
+loads = assemble_ABD(A, B, D) @ strains
 print()
 print('Loads:')
 print(loads)
\ No newline at end of file